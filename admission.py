@@ -0,0 +1,149 @@
+"""Admission control for Flowise calls.
+
+Two limits keep a burst of traffic from slowing every request down together:
+
+* a token bucket per session (ADMISSION_SESSION_RATE messages per second,
+  bursts of ADMISSION_SESSION_BURST), checked when a student sends a
+  message, so hammering "Send" is refused at once instead of queueing
+  LLM calls;
+* a process-wide limit of ADMISSION_MAX_CONCURRENT Flowise calls in flight.
+  Callers over the limit wait in a queue of at most ADMISSION_MAX_QUEUE
+  for up to ADMISSION_QUEUE_TIMEOUT seconds; beyond that they are refused
+  with Overloaded straight away rather than blocking a thread.
+
+Chat turns refused with Overloaded are retried a few times with backoff by
+``retry_when_busy`` while the page shows a "busy, retrying" status. Queue
+depth, calls in flight, waits and rejections are exported as metrics.
+"""
+import contextlib
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import instrumentation
+
+MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "16"))
+MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "5"))
+SESSION_RATE = float(os.environ.get("ADMISSION_SESSION_RATE", "0.2"))
+SESSION_BURST = float(os.environ.get("ADMISSION_SESSION_BURST", "5"))
+BUSY_RETRIES = int(os.environ.get("ADMISSION_BUSY_RETRIES", "3"))
+BUSY_BACKOFF = float(os.environ.get("ADMISSION_BUSY_BACKOFF", "1"))
+# Idle sessions' buckets are forgotten beyond this many
+MAX_TRACKED_SESSIONS = 10000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(AdmissionRejected):
+    """The session is sending messages faster than its token bucket allows."""
+
+
+class Overloaded(AdmissionRejected):
+    """Too many Flowise calls are in flight or queued in this process."""
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst):
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT,
+                 session_rate=SESSION_RATE, session_burst=SESSION_BURST):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self._buckets = OrderedDict()
+        self._bucket_lock = threading.Lock()
+        self._slots = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    def check_session(self, session_id):
+        """Take a token from the session's bucket, or raise RateLimited."""
+        if self.session_rate <= 0:
+            return
+        now = time.monotonic()
+        with self._bucket_lock:
+            bucket = self._buckets.get(session_id)
+            if bucket is None:
+                bucket = self._buckets[session_id] = TokenBucket(self.session_burst)
+                while len(self._buckets) > MAX_TRACKED_SESSIONS:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(session_id)
+            # A bucket created just now has ``updated`` after ``now``
+            elapsed = max(0.0, now - bucket.updated)
+            bucket.tokens = min(self.session_burst, bucket.tokens + elapsed * self.session_rate)
+            bucket.updated = now
+            if bucket.tokens < 1:
+                instrumentation.registry.inc("admission_rejected_total", {"reason": "rate"})
+                retry_after = (1 - bucket.tokens) / self.session_rate
+                raise RateLimited(f"Session {session_id} is over its message rate", retry_after)
+            bucket.tokens -= 1
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one of the process's Flowise call slots; raise Overloaded if none frees up."""
+        start = time.monotonic()
+        with self._slots:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    instrumentation.registry.inc("admission_rejected_total", {"reason": "queue_full"})
+                    raise Overloaded("Flowise call queue is full", self.queue_timeout)
+                self.waiting += 1
+                try:
+                    admitted = self._slots.wait_for(lambda: self.active < self.max_concurrent, self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    instrumentation.registry.inc("admission_rejected_total", {"reason": "queue_timeout"})
+                    raise Overloaded("Timed out waiting for a Flowise call slot", self.queue_timeout)
+            self.active += 1
+        instrumentation.registry.observe("admission_wait_seconds", {}, time.monotonic() - start)
+        try:
+            yield
+        finally:
+            with self._slots:
+                self.active -= 1
+                self._slots.notify()
+
+    def stats(self):
+        with self._slots:
+            return {"active": self.active, "waiting": self.waiting}
+
+
+def retry_when_busy(call, on_busy=None, retries=BUSY_RETRIES, backoff=BUSY_BACKOFF):
+    """Return ``call()``, retrying with jittered backoff while it raises Overloaded.
+
+    ``on_busy(attempt, delay)`` is called before each wait, e.g. to show a
+    "busy, retrying" status. The last Overloaded is re-raised.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except Overloaded:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            if on_busy is not None:
+                on_busy(attempt + 1, delay)
+            time.sleep(delay)
+
+
+admission_controller = AdmissionController()
+instrumentation.registry.register_collector(
+    "admission",
+    lambda: [(f"admission_{name}", {}, value) for name, value in admission_controller.stats().items()],
+)
@@ -0,0 +1,120 @@
+"""Concurrent fan-out to the section chatflows for the Career Advice page.
+
+In "full profile" mode the Strengths & Weaknesses, Academic Background and
+Resume chatflows are each asked for a summary at the same time, so building
+the profile takes about as long as the slowest flow instead of the sum of
+all three. Calls go through endpoints (and so share flowise_client's
+connection pool and backend routing) on worker threads; an asyncio semaphore caps how many run at once and
+every call has its own deadline.
+
+A ProfileCache keeps each section's summary for as long as the section's
+question stays the same. A section that failed is asked again after
+ADVICE_FANOUT_RETRY_AFTER seconds, doubling with each further failure up to
+ADVICE_FANOUT_RETRY_AFTER_MAX, and the sections that answered are not asked
+again meanwhile.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import namedtuple
+
+import requests
+
+import endpoints
+import flowise_client
+import instrumentation
+from admission import AdmissionRejected
+
+MAX_CONCURRENCY = int(os.environ.get("ADVICE_FANOUT_CONCURRENCY", "3"))
+CALL_DEADLINE = float(os.environ.get("ADVICE_FANOUT_DEADLINE", "60"))
+RETRY_AFTER = float(os.environ.get("ADVICE_FANOUT_RETRY_AFTER", "30"))
+RETRY_AFTER_MAX = float(os.environ.get("ADVICE_FANOUT_RETRY_AFTER_MAX", "600"))
+
+
+SectionQuery = namedtuple("SectionQuery", "section api_url payload")
+SectionResult = namedtuple("SectionResult", "section text ok elapsed")
+
+
+def _post_traced(api_url, payload, timeout):
+    with instrumentation.trace("advice_fanout", api_url):
+        return endpoints.post_json(api_url, payload, timeout)
+
+
+async def _query_section(query, semaphore, deadline):
+    async with semaphore:
+        start = time.perf_counter()
+        # The read timeout bounds the worker thread too, not just the await
+        timeout = (flowise_client.get_config().connect_timeout, deadline)
+        try:
+            result = await asyncio.wait_for(
+                asyncio.to_thread(_post_traced, query.api_url, query.payload, timeout),
+                timeout=deadline,
+            )
+            return SectionResult(query.section, result.get("text", ""), True, time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            logging.error(f"Profile summary for {query.section} missed its {deadline}s deadline")
+            return SectionResult(query.section, "", False, time.perf_counter() - start)
+        except (requests.exceptions.RequestException, AdmissionRejected) as e:
+            logging.error(f"Error fetching profile summary for {query.section}: {e}")
+            return SectionResult(query.section, "", False, time.perf_counter() - start)
+
+
+async def gather_sections(queries, max_concurrency=MAX_CONCURRENCY, deadline=CALL_DEADLINE):
+    semaphore = asyncio.Semaphore(max_concurrency)
+    return await asyncio.gather(*(_query_section(q, semaphore, deadline) for q in queries))
+
+
+def fetch_profile(queries, max_concurrency=MAX_CONCURRENCY, deadline=CALL_DEADLINE):
+    """Run ``queries`` concurrently and return their SectionResults in order."""
+    if not queries:
+        return []
+    return asyncio.run(gather_sections(queries, max_concurrency, deadline))
+
+
+def profile_sections(results):
+    """Return {section: summary} for the sections that answered."""
+    return {r.section: r.text for r in results if r.ok and r.text}
+
+
+class ProfileCache:
+    """Section summaries of one session, with backoff for the failed ones."""
+
+    def __init__(self, retry_after=RETRY_AFTER, retry_after_max=RETRY_AFTER_MAX):
+        self.retry_after = retry_after
+        self.retry_after_max = retry_after_max
+        # section -> (question fingerprint, SectionResult, retry at, consecutive failures)
+        self._entries = {}
+
+    @staticmethod
+    def _fingerprint(query):
+        return hash((query.api_url, repr(query.payload)))
+
+    def due(self, queries, now=None):
+        """The queries whose section is not cached, changed, or failed and due a retry."""
+        now = time.monotonic() if now is None else now
+        due = []
+        for query in queries:
+            entry = self._entries.get(query.section)
+            if entry is None or entry[0] != self._fingerprint(query):
+                due.append(query)
+            elif not entry[1].ok and now >= entry[2]:
+                due.append(query)
+        return due
+
+    def update(self, queries, results, now=None):
+        now = time.monotonic() if now is None else now
+        for query, result in zip(queries, results):
+            fingerprint = self._fingerprint(query)
+            entry = self._entries.get(query.section)
+            if result.ok:
+                self._entries[query.section] = (fingerprint, result, None, 0)
+                continue
+            failures = entry[3] + 1 if entry is not None and entry[0] == fingerprint else 1
+            delay = min(self.retry_after_max, self.retry_after * 2 ** (failures - 1))
+            self._entries[query.section] = (fingerprint, result, now + delay, failures)
+
+    def profile(self, queries):
+        """{section: summary} for ``queries``' sections that answered."""
+        entries = [self._entries.get(query.section) for query in queries]
+        return profile_sections([entry[1] for entry in entries if entry is not None])
@@ -0,0 +1,204 @@
+"""Headless batch analysis of a folder of resumes.
+
+Career offices send whole cohorts at once; this runs every PDF under a
+directory through the same pipeline as the Resume Review page (budgeted
+extraction, normalization, then the resume chatflow with the text in
+overrideConfig) without Streamlit:
+
+* PDFs are extracted in a process pool (--extract-workers),
+* Flowise calls run from a bounded async pool (--concurrency), through the
+  endpoint routing and admission control the app uses,
+* every result is appended to a JSONL file as soon as it is known. That file
+  is the checkpoint: rerunning the same command skips resumes that already
+  have an "ok" record (matched on path, size and mtime) and retries the rest,
+* ``--parquet`` also writes the results as Parquet at the end (needs pyarrow).
+
+    python batch_resumes.py cohort/ --out cohort.jsonl --api-url https://.../prediction/<id>
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import endpoints
+import flowise_requests
+import instrumentation
+from admission import retry_when_busy
+
+DEFAULT_QUESTION = "My Resume:"
+
+
+def find_pdfs(directory):
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+
+def _fingerprint(path, directory):
+    stat = os.stat(path)
+    return os.path.relpath(path, directory), stat.st_size, stat.st_mtime_ns
+
+
+def load_checkpoint(out_path):
+    """Fingerprints of the resumes already analysed successfully in ``out_path``."""
+    done = set()
+    try:
+        with open(out_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by an interrupted run
+                    continue
+                if record.get("status") == "ok":
+                    done.add((record["file"], record["size"], record["mtime_ns"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def extract_resume(path):
+    """Runs in the extraction pool: the normalized text of one PDF."""
+    import pdf_extract
+    import resume_normalize
+
+    # Already in a worker process; don't fan pages out to a second pool. The
+    # file is mapped, not read into memory.
+    pages = pdf_extract.iter_page_texts(path, parallel_min_pages=float("inf"))
+    return resume_normalize.normalize_resume(pages)
+
+
+def ask_flowise(api_url, question, resume_text):
+    payload = flowise_requests.prepare_request(f"{question}\n\n{resume_text}", 'resume', resume_text)
+    with instrumentation.trace("batch_resume", api_url):
+        return retry_when_busy(lambda: endpoints.post_json(api_url, payload))
+
+
+def _mp_context():
+    # The event loop's worker threads already exist when the pool starts; don't fork them
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class BatchRun:
+    def __init__(self, directory, out_path, api_url, question=DEFAULT_QUESTION, concurrency=8, extract_workers=None):
+        self.directory = directory
+        self.out_path = out_path
+        self.api_url = api_url
+        self.question = question
+        self.concurrency = concurrency
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.ok = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def _write(self, out, record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        # One flushed line per resume, so an interrupted run loses at most the ones in flight
+        out.flush()
+        if record["status"] == "ok":
+            self.ok += 1
+        else:
+            self.errors += 1
+
+    async def _process(self, path, out, extract_pool, flowise_pool, flowise_slots):
+        loop = asyncio.get_running_loop()
+        relpath, size, mtime_ns = _fingerprint(path, self.directory)
+        record = {"file": relpath, "size": size, "mtime_ns": mtime_ns}
+        start = time.perf_counter()
+        try:
+            text = await loop.run_in_executor(extract_pool, extract_resume, path)
+            record["chars"] = len(text)
+            async with flowise_slots:
+                result = await loop.run_in_executor(flowise_pool, ask_flowise, self.api_url, self.question, text)
+            record.update(status="ok", answer=result.get("text", ""))
+        except Exception as e:
+            logging.error(f"Batch analysis of {relpath} failed: {e}")
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["elapsed_s"] = round(time.perf_counter() - start, 3)
+        self._write(out, record)
+
+    async def _run(self, paths):
+        queue = asyncio.Queue()
+        for path in paths:
+            queue.put_nowait(path)
+        flowise_slots = asyncio.Semaphore(self.concurrency)
+        # Enough consumers to keep both pools busy without queueing every PDF at once
+        consumers = self.concurrency + self.extract_workers
+        with ProcessPoolExecutor(self.extract_workers, mp_context=_mp_context()) as extract_pool, \
+                ThreadPoolExecutor(self.concurrency, thread_name_prefix="batch-flowise") as flowise_pool, \
+                open(self.out_path, "a", encoding="utf-8") as out:
+
+            async def consume():
+                while not queue.empty():
+                    path = queue.get_nowait()
+                    await self._process(path, out, extract_pool, flowise_pool, flowise_slots)
+
+            await asyncio.gather(*(consume() for _ in range(consumers)))
+
+    def run(self):
+        """Process every PDF not yet done; returns elapsed seconds."""
+        done = load_checkpoint(self.out_path)
+        paths = []
+        for path in find_pdfs(self.directory):
+            if _fingerprint(path, self.directory) in done:
+                self.skipped += 1
+            else:
+                paths.append(path)
+        endpoints.endpoint_registry.set_routes({"resume": self.api_url})
+        start = time.perf_counter()
+        asyncio.run(self._run(paths))
+        return time.perf_counter() - start
+
+
+def write_parquet(jsonl_path, parquet_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("--parquet needs pyarrow: pip install pyarrow")
+    latest = {}
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            # Later attempts of a resumed run supersede earlier ones
+            latest[(record["file"], record["size"], record["mtime_ns"])] = record
+    columns = ["file", "size", "mtime_ns", "status", "chars", "answer", "error", "elapsed_s"]
+    rows = [{column: record.get(column) for column in columns} for record in latest.values()]
+    pq.write_table(pa.Table.from_pylist(rows), parquet_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="folder searched recursively for PDFs")
+    parser.add_argument("--out", required=True, help="JSONL results file, also the checkpoint")
+    parser.add_argument("--api-url", required=True, help="resume chatflow prediction URL")
+    parser.add_argument("--question", default=DEFAULT_QUESTION, help="sent before the resume text")
+    parser.add_argument("--concurrency", type=int, default=8, help="Flowise calls in flight")
+    parser.add_argument("--extract-workers", type=int, default=None, help="extraction processes")
+    parser.add_argument("--parquet", help="also write the results to this Parquet file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    batch = BatchRun(args.directory, args.out, args.api_url, args.question, args.concurrency, args.extract_workers)
+    elapsed = batch.run()
+    processed = batch.ok + batch.errors
+    rate = processed / elapsed * 60 if elapsed > 0 else 0.0
+    print(
+        f"{processed} resumes in {elapsed:.1f}s ({rate:.1f}/min): "
+        f"{batch.ok} ok, {batch.errors} failed, {batch.skipped} already done"
+    )
+    if args.parquet:
+        write_parquet(args.out, args.parquet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Drive main.py headlessly with Streamlit's AppTest harness.
+
+The sidebar menu is a custom component that AppTest cannot click, so it is
+replaced with a stand-in that returns ``st.session_state["_bench_page"]``;
+set that key to pick the page a session is on. AppTest cannot upload files
+either, so ``st.file_uploader`` returns the bytes in
+``st.session_state["_bench_upload"]`` when that key is set. Flowise URLs can
+be pointed at a stub server with ``redirect_flowise``.
+"""
+import io
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+PAGE_KEY = "_bench_page"
+UPLOAD_KEY = "_bench_upload"
+
+
+class FakeUpload(io.BytesIO):
+    def __init__(self, data, name="resume.pdf"):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.type = "application/pdf"
+
+
+def _install_fake_option_menu():
+    import streamlit as st
+
+    fake = types.ModuleType("streamlit_option_menu")
+    fake.option_menu = lambda *args, **kwargs: st.session_state.get(PAGE_KEY, "Home")
+    sys.modules["streamlit_option_menu"] = fake
+
+
+def _install_fake_uploader():
+    import streamlit as st
+
+    if getattr(st.file_uploader, "_bench_fake", False):
+        return
+    file_uploader = st.file_uploader
+
+    def fake_uploader(*args, **kwargs):
+        data = st.session_state.get(UPLOAD_KEY)
+        if data is None:
+            return file_uploader(*args, **kwargs)
+        return FakeUpload(data)
+
+    fake_uploader._bench_fake = True
+    st.file_uploader = fake_uploader
+
+
+def redirect_flowise(server):
+    """Send every Flowise call to ``server`` (a StubFlowiseServer), keeping the flow id."""
+    import flowise_client
+
+    post_json, stream_prediction = flowise_client.post_json, flowise_client.stream_prediction
+
+    def local(url):
+        return server.prediction_url(url.rstrip("/").rsplit("/", 1)[-1])
+
+    flowise_client.post_json = lambda url, payload, timeout=None: post_json(local(url), payload, timeout)
+    flowise_client.stream_prediction = lambda url, payload, timeout=None: stream_prediction(local(url), payload, timeout)
+
+
+def new_session(page="Home", timeout=60):
+    """An AppTest for main.py that will render ``page`` on its next run."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    _install_fake_option_menu()
+    _install_fake_uploader()
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(MAIN, default_timeout=timeout)
+    at.session_state[PAGE_KEY] = page
+    return at
+
+
+def delta_bytes(at):
+    """Serialized size of every element the last run produced."""
+    total = 0
+    stack = [at._tree]
+    while stack:
+        node = stack.pop()
+        proto = getattr(node, "proto", None)
+        if proto is not None and hasattr(proto, "ByteSize"):
+            total += proto.ByteSize()
+        children = getattr(node, "children", None)
+        if children:
+            stack.extend(children.values())
+    return total
@@ -0,0 +1,52 @@
+"""Throughput of batch_resumes against a local stub Flowise server.
+
+Writes a folder of synthetic resumes, then runs the batch at a few Flowise
+concurrency levels against a stub that takes ``--latency`` seconds per
+answer, reporting resumes per minute. A run sequential in both extraction
+and Flowise calls (concurrency 1, one extraction process) is the baseline.
+
+    python -m benchmarks.bench_batch_resumes --resumes 60 --concurrency 1 4 16
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from batch_resumes import BatchRun
+from benchmarks.stub_flowise import StubFlowiseServer
+from benchmarks.synthetic_pdf import make_resume_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=60)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds per answer")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-batch-")
+    server = StubFlowiseServer(latency=args.latency).start()
+    try:
+        cohort = os.path.join(directory, "cohort")
+        os.makedirs(cohort)
+        for i in range(args.resumes):
+            with open(os.path.join(cohort, f"resume{i:04d}.pdf"), "wb") as f:
+                f.write(make_resume_pdf(pages=args.pages, seed=i, messy=True))
+
+        for concurrency in args.concurrency:
+            workers = 1 if concurrency == 1 else None
+            out = os.path.join(directory, f"c{concurrency}.jsonl")
+            batch = BatchRun(cohort, out, server.prediction_url("resume"), concurrency=concurrency, extract_workers=workers)
+            elapsed = batch.run()
+            print(
+                f"concurrency={concurrency:<3} extract_workers={batch.extract_workers:<2} "
+                f"{batch.ok} ok / {batch.errors} failed in {elapsed:6.2f}s = {batch.ok / elapsed * 60:7.1f} resumes/min"
+            )
+    finally:
+        server.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
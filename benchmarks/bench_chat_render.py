@@ -0,0 +1,65 @@
+"""Rerun time and delta size of a chat page with long histories.
+
+Fills the Strengths & Weaknesses chat with N turns and reruns the page,
+comparing full rendering (CHAT_RENDER_RECENT=0, every message its own
+bubble) with incremental rendering (the default: recent messages only).
+
+    python -m benchmarks.bench_chat_render --turns 10 100 500 --reruns 5
+"""
+import argparse
+import os
+import time
+
+from benchmarks.apptest_driver import delta_bytes, new_session
+from benchmarks.common import print_row
+
+TITLE = "Discover Your Strengths & Weaknesses"
+ANSWER = (
+    "Based on what you told me, you are **strong at analytical thinking** and enjoy structured problems. "
+    "Consider roles such as:\n\n- Data analyst\n- Actuarial trainee\n- Operations research\n\n"
+    "Areas to grow: presenting to larger audiences and delegating work."
+)
+
+
+def filled_session(turns):
+    import uuid
+
+    from conversation_store import ConversationStore
+
+    store = ConversationStore(uuid.uuid4().hex, max_messages=10 ** 6)
+    store.start(TITLE)
+    for i in range(turns):
+        store.append(TITLE, "user", f"Question {i}: what do my answers say about me?")
+        store.append(TITLE, "assistant", ANSWER)
+    at = new_session("Strengths & Weaknesses")
+    at.session_state["conversations"] = store
+    return at
+
+
+def measure(turns, reruns):
+    at = filled_session(turns)
+    at.run()
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+    assert not at.exception, at.exception
+    return samples, delta_bytes(at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    for turns in args.turns:
+        for label, recent in (("full", "0"), ("incremental", "20")):
+            os.environ["CHAT_RENDER_RECENT"] = recent
+            samples, size = measure(turns, args.reruns)
+            print_row(f"{turns} turns {label}", samples, f"delta={size / 1024:.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Call latency while a Flowise backend is down, with and without the breaker.
+
+Sends requests through endpoints.post_json to a stub Flowise whose
+predictions all stall past the read timeout (a Render dyno that accepts
+connections but never answers), first with the circuit breaker off and then
+on. With it on, the first FLOWISE_BREAKER_MIN_CALLS calls wait out the
+timeout and the rest are refused with CircuitOpen. The stub then recovers,
+and the report shows how long after that the half-open trial call brings
+the route back.
+
+    python -m benchmarks.bench_circuit_breaker --requests 20 --read-timeout 1
+"""
+import argparse
+import time
+
+import circuit_breaker
+import endpoints
+from benchmarks.common import print_row
+from benchmarks.stub_flowise import StubFlowiseServer
+
+ROUTE = "http://flowise.invalid/api/v1/prediction/route"
+
+
+def call(payload, timeout):
+    start = time.perf_counter()
+    try:
+        endpoints.post_json(ROUTE, payload, timeout)
+        outcome = "ok"
+    except circuit_breaker.CircuitOpen:
+        outcome = "open"
+    except Exception:
+        outcome = "failed"
+    return outcome, time.perf_counter() - start
+
+
+def run(server, breaker, n_requests, timeout, open_seconds):
+    endpoints.endpoint_registry = endpoints.EndpointRegistry({"bench": [server.prediction_url()]})
+    endpoints.endpoint_registry.set_routes({"bench": ROUTE})
+    pool = endpoints.endpoint_registry.pool_for(ROUTE)
+    pool.breaker = circuit_breaker.CircuitBreaker(pool.label, open_seconds=open_seconds) if breaker else None
+    payload = {"question": "What careers suit an analytical student?"}
+    results = [call(payload, timeout) for _ in range(n_requests)]
+    for outcome in ("failed", "open"):
+        samples = [elapsed for o, elapsed in results if o == outcome]
+        if samples:
+            print_row(f"breaker {'on' if breaker else 'off'}, {outcome}", samples)
+    print(f"breaker {'on' if breaker else 'off'}: {n_requests} calls took {sum(e for _, e in results):.2f}s")
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--read-timeout", type=float, default=1.0)
+    parser.add_argument("--open-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    timeout = (1.0, args.read_timeout)
+    server = StubFlowiseServer(stall_probability=1.0, stall_seconds=args.read_timeout + 2).start()
+    try:
+        run(server, False, args.requests, timeout, args.open_seconds)
+        payload = run(server, True, args.requests, timeout, args.open_seconds)
+
+        server.stall_probability = 0.0
+        recovered = time.perf_counter()
+        while True:
+            outcome, _ = call(payload, timeout)
+            if outcome == "ok":
+                break
+            time.sleep(0.05)
+        print(f"recovered {time.perf_counter() - recovered:.2f}s after the backend did "
+              f"(FLOWISE_BREAKER_OPEN_SECONDS={args.open_seconds:g})")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
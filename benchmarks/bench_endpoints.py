@@ -0,0 +1,74 @@
+"""Tail latency with one stalling backend vs. routed and hedged backends.
+
+Starts local stub Flowise servers where a fraction of predictions stall
+(like a cold-starting Render dyno) and sends the same requests through
+endpoints.post_json with: the single backend, two backends balanced by
+least outstanding requests, and two backends with hedging. The first
+``--warmup`` requests of each run, which give the router its latency
+samples, are not counted.
+
+    python -m benchmarks.bench_endpoints --requests 200 --concurrency 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import endpoints
+import flowise_client
+from benchmarks.common import print_row
+from benchmarks.stub_flowise import StubFlowiseServer
+
+ROUTE = "http://flowise.invalid/api/v1/prediction/route"
+
+
+def run(backends, hedge, n_requests, concurrency, warmup):
+    endpoints.endpoint_registry = endpoints.EndpointRegistry({"bench": [s.prediction_url() for s in backends]})
+    endpoints.endpoint_registry.set_routes({"bench": ROUTE})
+    endpoints.HEDGE = hedge
+    payload = {"question": "What careers suit an analytical student?"}
+
+    def one(_):
+        start = time.perf_counter()
+        endpoints.post_json(ROUTE, payload)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(warmup)))
+        for server in backends:
+            server.reset_stats()
+        samples = list(pool.map(one, range(n_requests)))
+    return samples, sum(server.requests for server in backends)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=endpoints.MIN_LATENCY_SAMPLES)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--stall-probability", type=float, default=0.05)
+    parser.add_argument("--stall-seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    servers = [
+        StubFlowiseServer(
+            latency=args.latency, stall_probability=args.stall_probability, stall_seconds=args.stall_seconds
+        ).start()
+        for _ in range(2)
+    ]
+    try:
+        for label, backends, hedge in (
+            ("single backend", servers[:1], False),
+            ("2 backends", servers, False),
+            ("2 backends hedged", servers, True),
+        ):
+            samples, sent = run(backends, hedge, args.requests, args.concurrency, args.warmup)
+            print_row(label, samples, f"backend requests={sent}")
+    finally:
+        flowise_client.close()
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare bare ``requests.post`` with the pooled flowise_client.
+
+Starts a local stub Flowise server and fires the same sequence of prediction
+requests both ways, sequentially and from a thread pool, reporting p50/p99
+latency and how many TCP connections the server had to accept. Against the
+real Render host every avoided connection also saves a TLS handshake, so the
+gap there is larger than on loopback.
+
+    python -m benchmarks.bench_flowise_client --requests 500 --concurrency 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import flowise_client
+from benchmarks.common import print_row
+from benchmarks.stub_flowise import StubFlowiseServer
+
+
+def bare_post(url, payload):
+    response = requests.post(url, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def pooled_post(url, payload):
+    return flowise_client.post_json(url, payload)
+
+
+def run(server, post, n_requests, concurrency):
+    url = server.prediction_url()
+    payload = {"question": "What careers suit an analytical student?"}
+
+    def one(_):
+        start = time.perf_counter()
+        post(url, payload)
+        return time.perf_counter() - start
+
+    server.reset_stats()
+    if concurrency <= 1:
+        samples = [one(i) for i in range(n_requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(one, range(n_requests)))
+    return samples, server.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005, help="stub server think time in seconds")
+    args = parser.parse_args()
+
+    server = StubFlowiseServer(latency=args.latency).start()
+    try:
+        for concurrency in (1, args.concurrency):
+            for label, post in (("requests.post", bare_post), ("flowise_client", pooled_post)):
+                flowise_client.close()
+                samples, connections = run(server, post, args.requests, concurrency)
+                print_row(f"{label} c={concurrency}", samples, f"connections={connections}")
+    finally:
+        flowise_client.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Rerun time and delta size of the Home page and navigation away from it.
+
+Runs one session back and forth between Home and a chat page and reports,
+for each page, the rerun time, the serialized size of the elements sent,
+how many of them are component iframes, and the third-party URLs the
+browser would fetch to show them.
+
+    python -m benchmarks.bench_home --reruns 50
+"""
+import argparse
+import re
+import time
+
+from benchmarks.apptest_driver import PAGE_KEY, new_session
+from benchmarks.common import print_row
+
+PAGES = ("Home", "Strengths & Weaknesses")
+_URL_RE = re.compile(rb"https?://[^\s\"'()<>]+")
+
+
+def _elements(at):
+    stack = [at._tree]
+    while stack:
+        node = stack.pop()
+        proto = getattr(node, "proto", None)
+        if proto is not None and hasattr(proto, "SerializeToString"):
+            yield proto
+        children = getattr(node, "children", None)
+        if children:
+            stack.extend(children.values())
+
+
+def page_report(at):
+    """(delta bytes, component iframes, set of third-party URLs) of the last run."""
+    size, components, urls = 0, 0, set()
+    for proto in _elements(at):
+        data = proto.SerializeToString()
+        size += len(data)
+        components += proto.DESCRIPTOR.name == "ComponentInstance"
+        urls.update(url.decode() for url in _URL_RE.findall(data) if b"127.0.0.1" not in url)
+    return size, components, urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    at = new_session("Home")
+    start = time.perf_counter()
+    at.run()
+    print_row("first run (Home)", [time.perf_counter() - start])
+
+    samples = {page: [] for page in PAGES}
+    reports = {}
+    for _ in range(args.reruns):
+        for page in PAGES:
+            at.session_state[PAGE_KEY] = page
+            start = time.perf_counter()
+            at.run()
+            samples[page].append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            reports[page] = page_report(at)
+    for page in PAGES:
+        size, components, urls = reports[page]
+        print_row(f"rerun to {page}", samples[page], f"delta {size} bytes, {components} iframes, {len(urls)} external URLs")
+        for url in sorted(urls):
+            print(f"    {url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Compare pdf_extract against the original single-threaded join.
+
+Generates synthetic text PDFs of increasing length and reports, for each,
+the time of ``''.join(page.extract_text() for page in reader.pages)`` and of
+pdf_extract.extract_text, plus how quickly pdf_extract yields the first page.
+A warm-up extraction starts the forkserver first; each extraction still
+starts its own workers, and that is counted.
+
+    python -m benchmarks.bench_pdf_extract --pages 5 20 40 --repeat 5
+"""
+import argparse
+import io
+import time
+
+from pypdf import PdfReader
+
+import pdf_extract
+from benchmarks.common import print_row
+from benchmarks.synthetic_pdf import make_resume_pdf
+
+
+def join_extract(pdf_bytes):
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    return ''.join(page.extract_text() for page in reader.pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 40])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pdf_extract.extract_text(make_resume_pdf(pages=pdf_extract.PARALLEL_MIN_PAGES), parallel_min_pages=0)
+    try:
+        for pages in args.pages:
+            pdf_bytes = make_resume_pdf(pages=pages, seed=pages)
+            baseline, engine, first_page = [], [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                expected = join_extract(pdf_bytes)
+                baseline.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                chunks = []
+                for text in pdf_extract.iter_page_texts(pdf_bytes):
+                    if not chunks:
+                        first_page.append(time.perf_counter() - start)
+                    chunks.append(text)
+                engine.append(time.perf_counter() - start)
+                assert ''.join(chunks) == expected
+            print(f"--- {pages} pages, {len(pdf_bytes) / 1024:.0f} KiB, workers={pdf_extract.WORKERS}")
+            print_row("join (baseline)", baseline)
+            print_row("pdf_extract total", engine)
+            print_row("pdf_extract first page", first_page)
+    finally:
+        pdf_extract.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Rerun time of a chat page with rerun profiling off and in each capture mode.
+
+Each mode runs in a fresh process (the RERUN_PROFILE* settings are read at
+import) with one session on a chat page holding --messages messages of
+history. RERUN_PROFILE_SLOW_MS is 0 in the profiled modes, so every rerun
+pays for stack capture and writing the output files: the worst case. The
+profiled runs also print the phase breakdown rerun_profiler aggregated.
+
+    python -m benchmarks.bench_rerun_profile --reruns 30 --messages 40
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    "off": {"RERUN_PROFILE": "0"},
+    "phases only": {"RERUN_PROFILE": "1", "RERUN_PROFILE_CAPTURE": "none"},
+    "sample": {"RERUN_PROFILE": "1", "RERUN_PROFILE_CAPTURE": "sample", "RERUN_PROFILE_SLOW_MS": "0"},
+    "cprofile": {"RERUN_PROFILE": "1", "RERUN_PROFILE_CAPTURE": "cprofile", "RERUN_PROFILE_SLOW_MS": "0"},
+}
+PAGE = "Strengths & Weaknesses"
+TITLE = "Discover Your Strengths & Weaknesses"
+
+
+def worker(reruns, messages):
+    import logging
+
+    from benchmarks.apptest_driver import new_session
+    from benchmarks.common import print_row
+
+    logging.disable(logging.WARNING)
+    at = new_session(PAGE)
+    at.run()
+    conversations = at.session_state["conversations"]
+    for i in range(messages // 2):
+        conversations.append(TITLE, "user", f"Question {i} about my strengths?")
+        conversations.append(TITLE, "assistant", f"Answer {i}: " + "You work well with others. " * 20)
+    at.run()
+
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    print_row("rerun", samples)
+
+    import rerun_profiler
+
+    if rerun_profiler.MODE != "0":
+        for row in rerun_profiler.phase_summary():
+            print(f"    {row['phase']:<32} n={row['count']:<4} mean={row['mean_ms']:7.1f}ms p95<={row['p95_ms']:g}ms")
+        for path in rerun_profiler.output_files():
+            print(f"    wrote {path} ({os.path.getsize(path)} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=30)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.reruns, args.messages)
+        return
+    for mode, env in MODES.items():
+        with tempfile.TemporaryDirectory() as profile_dir:
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_rerun_profile", "--worker",
+                 "--reruns", str(args.reruns), "--messages", str(args.messages)],
+                env=dict(os.environ, RERUN_PROFILE_DIR=profile_dir, **env),
+                capture_output=True, text=True, check=True,
+            )
+        print(f"--- {mode}")
+        print(result.stdout, end="")
+
+
+if __name__ == "__main__":
+    main()
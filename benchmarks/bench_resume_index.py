@@ -0,0 +1,78 @@
+"""Build time, query latency and follow-up payload size with resume_index.
+
+Extracts synthetic resumes of several lengths, builds a ResumeIndex for
+each, and reports how long the build and a follow-up query take and the
+size of a follow-up request to the resume chatflow with the whole resume in
+overrideConfig (before) and with the top-k chunks (after).
+
+    python -m benchmarks.bench_resume_index --pages 2 5 20 --repeat 20
+"""
+import argparse
+import time
+
+import flowise_client
+import pdf_extract
+import resume_index
+import resume_normalize
+from benchmarks.common import print_row
+from benchmarks.synthetic_pdf import make_resume_pdf
+from context_compaction import count_tokens
+from flowise_requests import build_flowise_payload
+
+QUESTIONS = (
+    "Which of my projects shows the most leadership?",
+    "How should I describe my internship in finance?",
+    "Is my education section strong enough for a software engineering role?",
+    "What skills am I missing for a data analysis job?",
+    "Can you suggest better wording for my volunteer experience?",
+    "What do you think overall?",
+)
+
+
+def payload_bytes(question, text):
+    return len(flowise_client.dumps(build_flowise_payload(question, 'resume', text)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 5, 20])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=resume_index.TOP_K)
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        pdf = make_resume_pdf(pages=pages, messy=True)
+        text = resume_normalize.normalize_resume(pdf_extract.iter_page_texts(pdf, parallel_min_pages=10 ** 6))
+
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            index = resume_index.ResumeIndex(text)
+            samples.append(time.perf_counter() - start)
+        print(f"--- {pages} pages, {len(text)} characters")
+        print_row("build", samples, f"{len(index)} chunks, {index.nbytes} bytes of index")
+
+        samples = []
+        for _ in range(args.repeat):
+            for question in QUESTIONS:
+                start = time.perf_counter()
+                index.top_k(question, args.top_k)
+                samples.append(time.perf_counter() - start)
+        print_row("query (top-k)", samples)
+
+        before = after = tokens_before = tokens_after = 0
+        for question in QUESTIONS:
+            context = index.context(question, args.top_k)
+            before += payload_bytes(question, text)
+            after += payload_bytes(question, context)
+            tokens_before += count_tokens(text)
+            tokens_after += count_tokens(context)
+        print(
+            f"follow-up payload: {before // len(QUESTIONS)} -> {after // len(QUESTIONS)} bytes "
+            f"({100 * (before - after) / before:.0f}% smaller), "
+            f"resume tokens {tokens_before // len(QUESTIONS)} -> {tokens_after // len(QUESTIONS)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
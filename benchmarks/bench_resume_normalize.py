@@ -0,0 +1,44 @@
+"""Payload size of the resume text before and after resume_normalize.
+
+Extracts synthetic resumes (with repeated headers, page numbers, layout
+whitespace and hyphenated line breaks) and reports the characters and
+tokens that would be sent to Flowise raw and normalized, and the time the
+normalization adds.
+
+    python -m benchmarks.bench_resume_normalize --pages 2 5 20 --repeat 5
+"""
+import argparse
+import time
+
+import pdf_extract
+import resume_normalize
+from benchmarks.common import print_row
+from benchmarks.synthetic_pdf import make_resume_pdf
+from context_compaction import count_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 5, 20])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for pages in args.pages:
+        page_texts = list(pdf_extract.iter_page_texts(make_resume_pdf(pages=pages, messy=True), parallel_min_pages=10 ** 6))
+        raw = "".join(page_texts)
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            text, stats = resume_normalize.normalize_pages(page_texts)
+            samples.append(time.perf_counter() - start)
+        raw_tokens, tokens = count_tokens(raw), count_tokens(text)
+        print_row(
+            f"{pages} pages",
+            samples,
+            f"chars {len(raw)} -> {len(text)} ({100 * (len(raw) - len(text)) / len(raw):.1f}% removed), "
+            f"tokens {raw_tokens} -> {tokens}, {stats.as_dict()}",
+        )
+
+
+if __name__ == "__main__":
+    main()
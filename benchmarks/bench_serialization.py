@@ -0,0 +1,103 @@
+"""Cost of serializing a resume request for Flowise.
+
+Builds the resume chatflow payload (the text in both the question and
+overrideConfig, as batch_resumes sends it) at realistic resume sizes and
+times:
+
+* before: what each call used to pay, requests' ``json=`` encoding plus
+  ``str(payload)`` for the log line,
+* PreparedPayload with the stdlib encoder and with orjson (when installed),
+* the streaming variant, spliced from the prepared body vs serialized again,
+* gzip of the body, with the compression ratio.
+
+    python -m benchmarks.bench_serialization --sizes 10000 100000 1000000
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+import flowise_client
+from benchmarks.common import print_row
+from benchmarks.synthetic_pdf import WORDS
+from flowise_requests import build_flowise_payload
+
+# Names and punctuation the stdlib encoder escapes by default
+EXTRA_WORDS = ("Zoë", "Müller", "São", "Paulo", "–", "café", "naïve", "Łódź")
+
+
+def resume_text(chars, seed=0):
+    rng = random.Random(seed)
+    vocabulary = list(WORDS) + list(EXTRA_WORDS)
+    lines = []
+    size = 0
+    while size < chars:
+        line = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 14)))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:chars]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def old_call(payload):
+    # requests' json= (ensure_ascii, default separators) and the old log line
+    body = json.dumps(payload, allow_nan=False).encode("utf-8")
+    len(str(payload))
+    return body
+
+
+def prepared_with(encoder, payload):
+    saved = flowise_client.orjson
+    flowise_client.orjson = encoder
+    try:
+        return flowise_client.PreparedPayload(payload)
+    finally:
+        flowise_client.orjson = saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="resume characters")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    encoders = [("stdlib", None)]
+    if flowise_client.orjson is not None:
+        encoders.append(("orjson", flowise_client.orjson))
+    else:
+        print("orjson is not installed; PreparedPayload falls back to the stdlib encoder")
+
+    for chars in args.sizes:
+        text = resume_text(chars)
+        payload = build_flowise_payload(f"My Resume:\n\n{text}", 'resume', text)
+        print(f"--- resume of {chars} characters")
+
+        samples, body = timed(lambda: old_call(payload), args.repeat)
+        print_row("before (json= + log str)", samples, f"{len(body)} bytes")
+
+        for label, encoder in encoders:
+            samples, prepared = timed(lambda: prepared_with(encoder, payload), args.repeat)
+            print_row(f"prepared ({label})", samples, f"{len(prepared.body)} bytes")
+
+        prepared = flowise_client.PreparedPayload(payload)
+        samples, _ = timed(lambda: flowise_client.dumps(dict(payload, streaming=True)), args.repeat)
+        print_row("streaming, serialized again", samples)
+        samples, _ = timed(prepared._streaming_body, args.repeat)
+        print_row("streaming, spliced", samples)
+
+        samples, compressed = timed(lambda: gzip.compress(prepared.body, compresslevel=5), args.repeat)
+        ratio = len(compressed) / len(prepared.body)
+        print_row("gzip level 5", samples, f"{len(compressed)} bytes ({ratio:.0%} of the body)")
+
+
+if __name__ == "__main__":
+    main()
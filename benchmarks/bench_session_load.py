@@ -0,0 +1,80 @@
+"""Session load latency on reconnect, per persistence backend.
+
+Saves sessions with a resume and N chat turns spread over the chatbots,
+then measures ``SessionPersister.load`` (read + rehydrate the
+ConversationStore) as a reconnecting student on another replica would hit
+it, and the write-behind flush time per batch of sessions.
+
+    python -m benchmarks.bench_session_load --turns 10 100 500 --sessions 50
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import print_row
+from conversation_store import ConversationStore
+from session_persistence import FileBackend, SessionPersister, SQLiteBackend
+
+TITLES = (
+    "Discover Your Strengths & Weaknesses",
+    "Resume Analysis",
+    "Explore Your Academic Background",
+    "Career Advice",
+)
+RESUME = "Jane Doe, BSc Computer Science. Experience: data analyst intern, teaching assistant. " * 40
+ANSWER = "You show strong analytical skills and enjoy structured problems; consider data roles. " * 4
+
+
+def make_session(turns):
+    store = ConversationStore(uuid.uuid4().hex, max_messages=10 ** 6)
+    store.start(TITLES[1])
+    store.append(TITLES[1], "user", "My Resume:", RESUME)
+    store.append(TITLES[1], "assistant", ANSWER)
+    for i in range(turns):
+        title = random.choice(TITLES)
+        store.append(title, "user", f"Question {i}: what should I focus on next?")
+        store.append(title, "assistant", ANSWER)
+    return store
+
+
+def run(name, backend, turns, sessions):
+    persister = SessionPersister(backend)
+    stores = [make_session(turns) for _ in range(sessions)]
+    for store in stores:
+        persister.schedule(store.session_id, store, RESUME)
+    start = time.perf_counter()
+    persister.flush()
+    flush = time.perf_counter() - start
+
+    # A fresh persister, as on another replica
+    reader = SessionPersister(backend)
+    samples = []
+    for store in stores:
+        start = time.perf_counter()
+        restored, _ = reader.load(store.session_id)
+        samples.append(time.perf_counter() - start)
+        assert restored.summaries() == store.summaries()
+    print_row(f"{name} {turns} turns", samples, f"flush {sessions} sessions={flush * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-sessions-")
+    try:
+        for turns in args.turns:
+            run("sqlite", SQLiteBackend(os.path.join(directory, f"{turns}.sqlite3")), turns, args.sessions)
+            run("file", FileBackend(os.path.join(directory, str(turns))), turns, args.sessions)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
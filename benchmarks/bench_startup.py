@@ -0,0 +1,101 @@
+"""Cold-start report for main.py.
+
+Two measurements, each in fresh interpreter processes so nothing is cached
+in sys.modules:
+
+* ``-X importtime``: the top-level modules the Home page pulls in, by
+  cumulative import time, followed by the modules that are only imported on
+  the page that needs them (these should not show up in the first list).
+* time to first render: how long the first run of main.py takes under
+  Streamlit's AppTest harness (the Home page), which is what a user hitting
+  a freshly scaled-up container waits for.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+HOME_IMPORTS = ["streamlit", "streamlit_option_menu", "instrumentation", "response_cache", "resume_cache"]
+DEFERRED_IMPORTS = {
+    "requests": "any chatbot page (first Flowise call)",
+    "flowise_client": "any chatbot page (first Flowise call)",
+    "pdf_extract": "Resume Review",
+    "pypdf": "Resume Review",
+    "context_compaction": "Career Advice",
+    "advice_fanout": "Career Advice (full profile mode)",
+}
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+FIRST_RENDER_SNIPPET = """
+import sys, time
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({main!r}, default_timeout=60)
+start = time.perf_counter()
+at.run()
+print(time.perf_counter() - start)
+print(",".join(sorted(m for m in {deferred!r} if m in sys.modules)))
+"""
+
+
+def import_times(modules):
+    """Return {module: cumulative_seconds} for top-level imports of ``modules``."""
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        # One space of indentation marks a top-level import
+        if match and len(match.group(3)) == 1:
+            times[match.group(4)] = int(match.group(2)) / 1e6
+    return times
+
+
+def first_render():
+    code = FIRST_RENDER_SNIPPET.format(root=ROOT, main=MAIN, deferred=sorted(DEFERRED_IMPORTS))
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed, loaded = result.stdout.strip().splitlines()[-2:]
+    return float(elapsed), [m for m in loaded.split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print("Top-level imports on the Home page (cumulative):")
+    times = import_times(HOME_IMPORTS)
+    for module, seconds in sorted(times.items(), key=lambda item: -item[1])[:15]:
+        print(f"  {module:<28} {seconds * 1000:8.1f}ms")
+    print(f"  {'total':<28} {sum(times.values()) * 1000:8.1f}ms")
+
+    print("Deferred imports (cost paid on first use):")
+    for module, page in DEFERRED_IMPORTS.items():
+        # Measured on top of streamlit, which already pulls in some shared dependencies
+        seconds = import_times(["streamlit", module]).get(module, 0.0)
+        print(f"  {module:<28} {seconds * 1000:8.1f}ms  ({page})")
+
+    samples = []
+    loaded = []
+    for _ in range(args.runs):
+        elapsed, loaded = first_render()
+        samples.append(elapsed)
+    print(f"Time to first render (Home, cold process): median {statistics.median(samples) * 1000:.1f}ms "
+          f"min {min(samples) * 1000:.1f}ms max {max(samples) * 1000:.1f}ms over {args.runs} runs")
+    if loaded:
+        print(f"  deferred modules loaded by the Home page: {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Time-to-first-token: blocking predictions versus SSE streaming.
+
+The stub server waits ``--latency`` seconds (prompt processing) and then
+emits one token every ``--token-interval`` seconds, roughly like an LLM
+generating an answer. With the blocking path the user sees nothing until the
+whole answer is generated; with streaming the first token shows up after the
+prompt latency.
+
+    python -m benchmarks.bench_streaming --requests 20 --response-chars 1500
+"""
+import argparse
+import time
+
+import flowise_client
+from benchmarks.common import print_row
+from benchmarks.stub_flowise import StubFlowiseServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-interval", type=float, default=0.005)
+    parser.add_argument("--response-chars", type=int, default=1500)
+    args = parser.parse_args()
+
+    server = StubFlowiseServer(
+        latency=args.latency,
+        response_chars=args.response_chars,
+        token_interval=args.token_interval,
+    ).start()
+    url = server.prediction_url()
+    payload = {"question": "Which careers fit my strengths?"}
+    blocking, first_token, stream_total = [], [], []
+    try:
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            flowise_client.post_json(url, payload)
+            blocking.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            ttft = None
+            for token in flowise_client.stream_prediction(url, payload):
+                if ttft is None and token:
+                    ttft = time.perf_counter() - start
+            first_token.append(ttft)
+            stream_total.append(time.perf_counter() - start)
+    finally:
+        flowise_client.close()
+        server.stop()
+
+    print_row("blocking first paint", blocking)
+    print_row("streaming first token", first_token)
+    print_row("streaming complete", stream_total)
+
+
+if __name__ == "__main__":
+    main()
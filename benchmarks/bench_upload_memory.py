@@ -0,0 +1,125 @@
+"""Resident memory while N resume uploads are extracted at once.
+
+Each measurement runs in a fresh process holding N distinct uploads (as
+Streamlit does, one BytesIO per session) of about --size-mb each, then
+extracts them all concurrently from N threads:
+
+* before: ``getvalue()``, a cache key hashed over ``prefix + data`` and
+  PdfReader over a BytesIO, as main.py used to,
+* after: the current path, extraction_cache's in-place hash and
+  pdf_extract.iter_page_texts, which spools uploads over PDF_SPOOL_BYTES
+  to a memory-mapped temporary file.
+
+RSS is sampled every few milliseconds; the report is the peak above the
+baseline with the uploads already in memory.
+
+    python -m benchmarks.bench_upload_memory --uploads 1 4 8 --size-mb 9
+"""
+import argparse
+import hashlib
+import io
+import subprocess
+import sys
+import threading
+import time
+
+
+def rss_bytes():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class PeakSampler(threading.Thread):
+    def __init__(self, interval=0.002):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, rss_bytes())
+
+
+def extract_before(upload):
+    from pypdf import PdfReader
+
+    import resume_normalize
+
+    data = upload.getvalue()
+    hashlib.sha256(b"v2:" + data).hexdigest()
+    reader = PdfReader(io.BytesIO(data))
+    return resume_normalize.normalize_resume(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_after(upload):
+    import pdf_extract
+    import resume_normalize
+    from resume_cache import ExtractionCache
+
+    data = upload.getvalue()
+    ExtractionCache.key_for(data)
+    return resume_normalize.normalize_resume(pdf_extract.iter_page_texts(data))
+
+
+def worker(mode, uploads, size_mb):
+    import logging
+
+    from benchmarks.synthetic_pdf import make_resume_pdf
+
+    logging.disable(logging.WARNING)
+    extract = extract_before if mode == "before" else extract_after
+    # Warm up imports so they are not counted
+    extract(io.BytesIO(make_resume_pdf(pages=2)))
+    files = [io.BytesIO(make_resume_pdf(pages=5, seed=i, padding=int(size_mb * 2 ** 20))) for i in range(uploads)]
+    baseline = rss_bytes()
+    sampler = PeakSampler()
+    sampler.start()
+    texts = [None] * uploads
+
+    def run(i):
+        texts[i] = extract(files[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(uploads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+    print(f"{(sampler.peak - baseline) / 2 ** 20:.1f} {elapsed:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--size-mb", type=float, default=9)
+    parser.add_argument("--worker", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.uploads[0], args.size_mb)
+        return
+    for uploads in args.uploads:
+        for mode in ("before", "after"):
+            result = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_upload_memory", "--worker", mode,
+                 "--uploads", str(uploads), "--size-mb", str(args.size_mb)],
+                capture_output=True, text=True, check=True,
+            )
+            peak, elapsed = result.stdout.split()
+            print(f"{uploads:>3} uploads of {args.size_mb:g} MB, {mode:<6}: peak +{peak} MiB RSS, {float(elapsed) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
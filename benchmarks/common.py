@@ -0,0 +1,26 @@
+"""Helpers shared by the benchmark scripts."""
+import statistics
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Return (p50, p95, p99, mean) of ``samples`` in milliseconds."""
+    ms = [s * 1000 for s in samples]
+    return (
+        percentile(ms, 50),
+        percentile(ms, 95),
+        percentile(ms, 99),
+        statistics.fmean(ms) if ms else 0.0,
+    )
+
+
+def print_row(label, samples, extra=""):
+    p50, p95, p99, mean = summarize(samples)
+    print(f"{label:<28} n={len(samples):<5} p50={p50:8.2f}ms p95={p95:8.2f}ms p99={p99:8.2f}ms mean={mean:8.2f}ms {extra}")
@@ -0,0 +1,215 @@
+"""End-to-end load test of main.py against a stub Flowise server.
+
+Runs ``--sessions`` simulated students at once (``--concurrency`` at a
+time), each an AppTest session walking through every page: Home, Strengths
+& Weaknesses, Academic Background, Resume Review (uploading a synthetic
+PDF) and Career Advice, sending ``--messages`` chat messages on each chat
+page and waiting for every answer. The stub's latency and answer length can
+be drawn from distributions (see stub_flowise.distribution).
+
+AppTest is not thread-safe (each run installs a process-wide Runtime), so
+script runs are serialized with a lock, much as one core serializes them
+on a real server. Answers are still generated concurrently on the chat
+executor while other sessions rerun, so run with the default
+CHAT_BACKGROUND=1; with it off every turn holds the lock until answered.
+
+A turn only counts as answered if it appended an answer (not an error
+text) to the page's chat and showed no warning; refused or failed turns are
+counted separately and not timed. Students rarely send a message every few
+seconds, so the per-session rate limit is off unless --session-rate is set.
+
+Reports, per page, p50/p95/p99 of the page render and of an answered chat
+turn (send to answer shown), overall throughput of answered turns, refused
+turns, and resident memory and chat history bytes per session.
+
+    python -m benchmarks.load_test --sessions 20 --concurrency 10 --latency lognormal:0.3,0.5
+"""
+import argparse
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.apptest_driver import UPLOAD_KEY, new_session, redirect_flowise
+from benchmarks.common import print_row
+from benchmarks.stub_flowise import StubFlowiseServer, distribution
+from benchmarks.synthetic_pdf import make_resume_pdf
+
+CHAT_PAGES = ("Strengths & Weaknesses", "Academic Background", "Resume Review", "Career Advice")
+# Page -> title of its chat in the session's ConversationStore
+CHAT_TITLES = {
+    "Strengths & Weaknesses": "Discover Your Strengths & Weaknesses",
+    "Academic Background": "Academic Background",
+    "Resume Review": "Resume Analysis",
+    "Career Advice": "Career Advice",
+}
+PAGES = ("Home",) + CHAT_PAGES
+
+
+_run_lock = threading.Lock()
+
+
+def _run(runnable):
+    """``runnable.run()`` (an AppTest or a widget) under the shared lock."""
+    with _run_lock:
+        return runnable.run()
+
+
+def rss_bytes():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+        self.refused = collections.Counter()
+
+    def add(self, key, seconds):
+        with self._lock:
+            self.samples[key].append(seconds)
+
+    def refuse(self, page):
+        with self._lock:
+            self.refused[page] += 1
+
+
+def _pending(at):
+    return any(button.label == "Cancel" for button in at.button)
+
+
+def _wait_for_answer(at, poll, timeout):
+    deadline = time.monotonic() + timeout
+    while _pending(at):
+        if time.monotonic() > deadline:
+            raise TimeoutError("answer did not arrive")
+        time.sleep(poll)
+        _run(at)
+
+
+def _message_count(at, page):
+    conversations = at.session_state["conversations"]
+    title = CHAT_TITLES[page]
+    return len(conversations.messages(title)) + conversations.spilled_count(title)
+
+
+def _answered(at, page, count_before):
+    """Whether the turn sent since ``count_before`` messages got a real answer."""
+    if at.warning:
+        return False
+    messages = at.session_state["conversations"].messages(CHAT_TITLES[page])
+    return (
+        _message_count(at, page) == count_before + 2
+        and messages[-1].role == "assistant"
+        and not messages[-1].error
+    )
+
+
+def _check(at, page):
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].message}")
+
+
+def run_session(index, args, recorder, resume_pdf):
+    at = new_session("Home", timeout=args.timeout)
+    at.session_state[UPLOAD_KEY] = resume_pdf
+    for page in PAGES:
+        at.session_state["_bench_page"] = page
+        start = time.perf_counter()
+        _run(at)
+        _check(at, page)
+        recorder.add((page, "render"), time.perf_counter() - start)
+        if page not in CHAT_PAGES:
+            continue
+        # Resume Review and Career Advice open with an automatic first message
+        _wait_for_answer(at, args.poll, args.timeout)
+        for i in range(args.messages):
+            count = _message_count(at, page)
+            start = time.perf_counter()
+            at.text_input[0].input(f"Session {index} question {i} about {page}")
+            _run(next(button for button in at.button if button.label == "Send").click())
+            _check(at, page)
+            _wait_for_answer(at, args.poll, args.timeout)
+            elapsed = time.perf_counter() - start
+            if _answered(at, page, count):
+                recorder.add((page, "turn"), elapsed)
+            else:
+                recorder.refuse(page)
+    return at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=2, help="chat messages per chat page")
+    parser.add_argument("--latency", type=distribution, default=distribution("lognormal:0.3,0.5"))
+    parser.add_argument("--response-chars", type=distribution, default=distribution("uniform:200,1200"))
+    parser.add_argument("--token-interval", type=float, default=0.005)
+    parser.add_argument("--resume-pages", type=int, default=3)
+    parser.add_argument("--poll", type=float, default=0.1, help="seconds between reruns while an answer is pending")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--session-rate", type=float, default=0,
+                        help="per-session messages/second (ADMISSION_SESSION_RATE); 0 disables the limit")
+    args = parser.parse_args()
+
+    from admission import admission_controller
+
+    admission_controller.session_rate = args.session_rate
+
+    server = StubFlowiseServer(
+        latency=args.latency, response_chars=args.response_chars, token_interval=args.token_interval
+    ).start()
+    redirect_flowise(server)
+    resume_pdf = make_resume_pdf(pages=args.resume_pages, messy=True)
+    recorder = Recorder()
+
+    # Warm up imports, pools and caches outside the measurement
+    run_session(-1, argparse.Namespace(**dict(vars(args), messages=0)), Recorder(), resume_pdf)
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    failures = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_session, i, args, recorder, resume_pdf) for i in range(args.sessions)]
+        sessions = []
+        for future in futures:
+            try:
+                sessions.append(future.result())
+            except Exception as e:
+                failures.append(e)
+    elapsed = time.perf_counter() - start
+    rss_after = rss_bytes()
+    server.stop()
+
+    for page in PAGES:
+        for kind in ("render", "turn"):
+            samples = recorder.samples.get((page, kind))
+            if samples:
+                print_row(f"{page} {kind}", samples)
+    turns = sum(len(v) for (_, kind), v in recorder.samples.items() if kind == "turn")
+    refused = sum(recorder.refused.values())
+    print(
+        f"{len(sessions)} sessions ({len(failures)} failed) in {elapsed:.1f}s: "
+        f"{turns / elapsed:.2f} answered turns/s, {len(sessions) / elapsed * 60:.1f} sessions/min"
+    )
+    if refused:
+        per_page = ", ".join(f"{page} {n}" for page, n in recorder.refused.items())
+        print(f"{refused} turns refused or failed, not timed: {per_page}")
+    if sessions:
+        history = sum(at.session_state["conversations"].nbytes() for at in sessions) / len(sessions)
+        print(
+            f"memory per session: {(rss_after - rss_before) / len(sessions) / 1024:.0f} KiB RSS, "
+            f"{history / 1024:.1f} KiB chat history"
+        )
+    for failure in failures[:5]:
+        print(f"failure: {failure!r}")
+
+
+if __name__ == "__main__":
+    main()
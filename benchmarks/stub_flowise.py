@@ -0,0 +1,199 @@
+"""Local stand-in for the Flowise prediction API, used by the benchmarks.
+
+Answers ``POST /api/v1/prediction/<id>`` with ``{"text": ...}`` after a
+configurable delay and with a configurable answer length (each fixed, or
+drawn from a distribution, see ``distribution``), speaks HTTP/1.1 keep-alive, and counts the TCP
+connections it accepts so benchmarks can show connection reuse. Requests
+with ``"streaming": true`` get the answer as Flowise-style server-sent
+events, one token every ``token_interval`` seconds. ``stall_probability``
+makes that fraction of predictions hang for ``stall_seconds`` first, like a
+cold-starting Render dyno.
+
+Run standalone with ``python benchmarks/stub_flowise.py --port 3000``.
+"""
+import argparse
+import gzip
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def distribution(spec):
+    """A number, or a sampler, from a spec such as ``0.2``, ``uniform:0.1,0.5``,
+    ``lognormal:0.3,0.5`` (median, sigma) or ``exp:0.3`` (mean)."""
+    kind, _, params = str(spec).partition(":")
+    if not params:
+        return float(kind)
+    values = [float(v) for v in params.split(",")]
+    if kind == "uniform":
+        return lambda: random.uniform(*values)
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    if kind == "exp":
+        return lambda: random.expovariate(1 / values[0])
+    raise ValueError(f"Unknown distribution: {spec}")
+
+
+def _sample(value):
+    return value() if callable(value) else value
+
+
+class StubFlowiseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive response.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.record_connection()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body) if body else {}
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/api/v1/ping":
+            self._send_json(200, {"status": "pong"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.path.startswith("/api/v1/prediction/"):
+            self._send_json(404, {"error": "not found"})
+            return
+        payload = self._read_json()
+        self.server.record_request()
+        time.sleep(_sample(self.server.latency))
+        if self.server.stall_probability and random.random() < self.server.stall_probability:
+            time.sleep(self.server.stall_seconds)
+        answer = self.server.answer_for(payload)
+        if payload.get("streaming"):
+            self._send_event_stream(answer)
+        else:
+            # The LLM takes just as long to generate the answer when not streaming
+            time.sleep(self.server.token_interval * len(answer.split(" ")))
+            self._send_json(200, {"text": answer})
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_event(self, event, data):
+        message = json.dumps({"event": event, "data": data})
+        self._write_chunk(f"message:\ndata: {message}\n\n".encode())
+
+    def _send_event_stream(self, answer):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._send_event("start", "")
+        for token in answer.split(" "):
+            time.sleep(self.server.token_interval)
+            self._send_event("token", token + " ")
+        self._send_event("end", "[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubFlowiseServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, response_chars=400, token_interval=0.0,
+                 stall_probability=0.0, stall_seconds=0.0):
+        super().__init__(address, StubFlowiseHandler)
+        self.stall_probability = stall_probability
+        self.stall_seconds = stall_seconds
+        self.latency = latency
+        self.token_interval = token_interval
+        self.response_chars = response_chars
+        self._stats_lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def prediction_url(self, flow_id="stub"):
+        return f"{self.base_url}/api/v1/prediction/{flow_id}"
+
+    def answer_for(self, payload):
+        question = str(payload.get("question", ""))
+        text = f"Stub answer to: {question[:80]} "
+        chars = max(1, int(_sample(self.response_chars)))
+        return (text * (chars // len(text) + 1))[:chars]
+
+    def record_connection(self):
+        with self._stats_lock:
+            self.connections += 1
+
+    def record_request(self):
+        with self._stats_lock:
+            self.requests += 1
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.connections = 0
+            self.requests = 0
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency", type=distribution, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--response-chars", type=distribution, default=400)
+    parser.add_argument("--token-interval", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--stall-probability", type=float, default=0.0, help="fraction of predictions that stall")
+    parser.add_argument("--stall-seconds", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubFlowiseServer(
+        (args.host, args.port),
+        latency=args.latency,
+        response_chars=args.response_chars,
+        token_interval=args.token_interval,
+        stall_probability=args.stall_probability,
+        stall_seconds=args.stall_seconds,
+    )
+    print(f"Stub Flowise listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
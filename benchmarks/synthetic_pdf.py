@@ -0,0 +1,89 @@
+"""Generate synthetic multi-page resume PDFs for the benchmarks.
+
+Writes the PDF syntax directly (one Helvetica font, text-only pages) so the
+benchmarks need nothing beyond the standard library to create their inputs.
+"""
+import random
+
+WORDS = (
+    "managed developed analysed designed led coordinated implemented improved "
+    "python data team project customer research finance marketing software "
+    "university degree internship volunteer leadership communication budget "
+    "reporting stakeholders strategy operations engineering design analysis"
+).split()
+
+SECTIONS = ("Experience", "Education", "Skills", "Projects", "Awards", "Transcript")
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_lines(rng, page_number, lines_per_page, name, messy=False):
+    lines = [f"{name} - Curriculum Vitae", SECTIONS[page_number % len(SECTIONS)]]
+    carry = ""
+    for _ in range(lines_per_page):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 14))]
+        if not messy:
+            lines.append(" ".join(words))
+            continue
+        # Layout spacing, and a word hyphenated onto the next line now and then
+        line = carry + "".join(word + " " * rng.randint(1, 3) for word in words[:-1])
+        carry = ""
+        if rng.random() < 0.3 and len(words[-1]) > 5:
+            cut = len(words[-1]) // 2
+            line += words[-1][:cut] + "-"
+            carry = words[-1][cut:] + " "
+        else:
+            line += words[-1]
+        lines.append(line)
+    lines.append(f"Page {page_number + 1}")
+    return lines
+
+
+def make_resume_pdf(pages=10, lines_per_page=45, seed=0, name="Jordan Student", messy=False, padding=0):
+    """Return the bytes of a ``pages``-page text PDF.
+
+    ``messy`` adds the layout whitespace and hyphenated line breaks of
+    typical exported resumes. ``padding`` adds a binary stream of that many
+    bytes (standing in for an embedded photo or font) that no page uses.
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for number in range(pages):
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 770 Td"]
+        for line in _page_lines(rng, number, lines_per_page, name, messy):
+            ops.append(f"({_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+    if padding:
+        add(b"<< /Length %d >>\nstream\n" % padding + rng.randbytes(padding) + b"\nendstream")
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
@@ -0,0 +1,138 @@
+"""Bounded background executor for chatbot turns.
+
+A Flowise call can take tens of seconds. Running it inside the Streamlit
+script thread freezes that session's buttons and pins a server thread, so
+turns are submitted here instead: ``submit`` returns at once with a
+ChatTurn, a worker fills in the answer (token by token when streaming), and
+the page picks it up on a later rerun or fragment refresh.
+
+The pool is shared by every session in the process. Admission is bounded
+twice: by the number of turns in flight across the process and by the
+number each session may have queued, so a burst of students cannot queue
+unbounded work. Turns can be cancelled; a turn that has already started
+stops at its next token and its result is discarded.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+
+MAX_WORKERS = int(os.environ.get("CHAT_WORKERS", "16"))
+MAX_IN_FLIGHT = int(os.environ.get("CHAT_MAX_IN_FLIGHT", "64"))
+MAX_PER_SESSION = int(os.environ.get("CHAT_SESSION_QUEUE_LIMIT", "2"))
+# Finished turns nobody collected (closed tabs) are dropped after this long
+RESULT_TTL = float(os.environ.get("CHAT_RESULT_TTL", "600"))
+
+
+class ExecutorFull(Exception):
+    """Too many turns are already in flight, for the session or the process."""
+
+
+class ChatTurn:
+    def __init__(self, session_id, title, user_input):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.title = title
+        self.user_input = user_input
+        self.submitted_at = time.monotonic()
+        self.finished_at = None
+        self.cancelled = False
+        # Shown instead of the answer while there is none, e.g. "busy, retrying"
+        self.status = None
+        # The answer only reports a failure; kept out of conversation summaries
+        self.failed = False
+        self.future = None
+        self._chunks = []
+
+    def append(self, chunk):
+        self._chunks.append(chunk)
+
+    @property
+    def partial_text(self):
+        return "".join(self._chunks)
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def result(self):
+        """The answer text; only valid once done() is true."""
+        return self.future.result()
+
+
+class ChatExecutor:
+    def __init__(self, max_workers=MAX_WORKERS, max_in_flight=MAX_IN_FLIGHT, max_per_session=MAX_PER_SESSION):
+        self.max_in_flight = max_in_flight
+        self.max_per_session = max_per_session
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-turn")
+        self._lock = threading.Lock()
+        self._turns = {}
+        self.rejected = 0
+
+    def _sweep(self, now):
+        # Caller holds self._lock
+        for turn_id, turn in list(self._turns.items()):
+            if turn.finished_at is not None and (turn.cancelled or now - turn.finished_at > RESULT_TTL):
+                del self._turns[turn_id]
+
+    def _in_flight(self, session_id=None):
+        return sum(
+            1 for turn in self._turns.values()
+            if turn.finished_at is None and (session_id is None or turn.session_id == session_id)
+        )
+
+    def submit(self, session_id, title, user_input, job, *args):
+        """Queue ``job(turn, *args)`` and return its ChatTurn immediately."""
+        turn = ChatTurn(session_id, title, user_input)
+        with self._lock:
+            self._sweep(time.monotonic())
+            if self._in_flight(session_id) >= self.max_per_session or self._in_flight() >= self.max_in_flight:
+                self.rejected += 1
+                raise ExecutorFull(f"Too many chat turns in flight for session {session_id}")
+            self._turns[turn.id] = turn
+            turn.future = self._pool.submit(self._run, turn, job, args)
+        return turn
+
+    def _run(self, turn, job, args):
+        try:
+            return job(turn, *args)
+        except Exception as e:
+            logging.error(f"Chat turn for {turn.title} failed: {e}")
+            raise
+        finally:
+            turn.finished_at = time.monotonic()
+
+    def get(self, turn_id):
+        with self._lock:
+            return self._turns.get(turn_id)
+
+    def collect(self, turn_id):
+        """Forget a finished turn once its result has been shown."""
+        with self._lock:
+            return self._turns.pop(turn_id, None)
+
+    def cancel(self, turn_id):
+        with self._lock:
+            turn = self._turns.get(turn_id)
+            if turn is None:
+                return False
+            turn.cancelled = True
+            if turn.future.cancel():
+                turn.finished_at = time.monotonic()
+            # A running turn keeps counting against the limits until its worker
+            # notices the flag; _sweep drops it afterwards.
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": self._in_flight(), "tracked": len(self._turns), "rejected": self.rejected}
+
+
+chat_executor = ChatExecutor()
+instrumentation.registry.register_collector(
+    "chat_executor",
+    lambda: [(f"chat_executor_{name}", {}, value) for name, value in chat_executor.stats().items()],
+)
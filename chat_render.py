@@ -0,0 +1,42 @@
+"""Helpers for incremental rendering of long chat histories.
+
+Re-rendering every message on every rerun makes each interaction cost O(n)
+in markdown elements and websocket deltas. Instead only the most recent
+messages are rendered as individual chat bubbles; older ones are hidden
+behind a "show earlier" control and, when revealed, rendered a page at a
+time as a single markdown element built from per-message markdown that is
+cached across reruns and sessions.
+"""
+import functools
+
+SPEAKERS = {"user": "You", "assistant": "Counselor"}
+
+
+@functools.lru_cache(maxsize=4096)
+def message_markdown(role, content, has_attachment=False):
+    # str caches its own hash, so repeated lookups for a stored message are cheap
+    speaker = SPEAKERS.get(role, role.title())
+    suffix = " *(attachment)*" if has_attachment else ""
+    return f"**{speaker}:** {content}{suffix}"
+
+
+def page_markdown(messages):
+    return "\n\n---\n\n".join(
+        message_markdown(m.role, m.content, bool(m.attachment)) for m in messages
+    )
+
+
+def split_history(messages, recent, pages_shown, page_size):
+    """Split ``messages`` for display.
+
+    Returns ``(hidden, pages, tail)``: the number of older messages still
+    hidden, the revealed older messages as a list of pages (oldest first),
+    and the ``recent`` newest messages to render individually.
+    """
+    if recent <= 0 or len(messages) <= recent:
+        return 0, [], messages
+    older, tail = messages[:-recent], messages[-recent:]
+    revealed = min(len(older), pages_shown * page_size)
+    start = len(older) - revealed
+    pages = [older[i:i + page_size] for i in range(start, len(older), page_size)]
+    return start, pages, tail
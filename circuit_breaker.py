@@ -0,0 +1,134 @@
+"""Per-endpoint circuit breaker for Flowise calls.
+
+When a chatflow's backends are down, every call would otherwise wait out
+its connection attempts and retries before failing. Each route
+(endpoints.EndpointPool) has a CircuitBreaker that watches the outcome and
+latency of its calls over the last FLOWISE_BREAKER_WINDOW seconds:
+
+* closed: calls go through. Once at least FLOWISE_BREAKER_MIN_CALLS have
+  been seen, the breaker opens if FLOWISE_BREAKER_ERROR_RATE of them failed
+  (transport errors, timeouts, 5xx) or FLOWISE_BREAKER_SLOW_RATE of them
+  took longer than FLOWISE_BREAKER_SLOW_SECONDS,
+* open: calls are refused at once with CircuitOpen, for
+  FLOWISE_BREAKER_OPEN_SECONDS,
+* half-open: after that, one trial call is let through. If it succeeds the
+  breaker closes, otherwise it opens again.
+
+CircuitOpen is an AdmissionRejected, so callers that already handle a
+refused call (flowise_requests, advice_fanout) handle it the same way.
+State and transitions are exported as metrics. FLOWISE_BREAKER=0 turns the
+breaker off.
+"""
+import collections
+import logging
+import os
+import threading
+import time
+
+import instrumentation
+from admission import AdmissionRejected
+
+ENABLED = os.environ.get("FLOWISE_BREAKER", "1") != "0"
+WINDOW = float(os.environ.get("FLOWISE_BREAKER_WINDOW", "60"))
+MIN_CALLS = int(os.environ.get("FLOWISE_BREAKER_MIN_CALLS", "5"))
+ERROR_RATE = float(os.environ.get("FLOWISE_BREAKER_ERROR_RATE", "0.5"))
+SLOW_SECONDS = float(os.environ.get("FLOWISE_BREAKER_SLOW_SECONDS", "30"))
+SLOW_RATE = float(os.environ.get("FLOWISE_BREAKER_SLOW_RATE", "0.8"))
+OPEN_SECONDS = float(os.environ.get("FLOWISE_BREAKER_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# Values of the flowise_circuit_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(AdmissionRejected):
+    """The endpoint's circuit breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    def __init__(self, label, window=WINDOW, min_calls=MIN_CALLS, error_rate=ERROR_RATE,
+                 slow_seconds=SLOW_SECONDS, slow_rate=SLOW_RATE, open_seconds=OPEN_SECONDS):
+        self.label = label
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        # (time, failed, slow) of recent calls
+        self._calls = collections.deque()
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state, reason):
+        # Caller holds self._lock
+        previous, self.state = self.state, state
+        instrumentation.registry.inc("flowise_circuit_transitions_total", {"endpoint": self.label, "to": state})
+        log = logging.warning if state == OPEN else logging.info
+        log(f"Flowise circuit for {self.label} {previous} -> {state}: {reason}")
+
+    def allow(self):
+        """Reserve a call, or raise CircuitOpen without attempting it.
+
+        Returns True if the call is the half-open trial. Every allowed call
+        must be followed by record() or abandon() with that value.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    instrumentation.registry.inc("flowise_circuit_rejected_total", {"endpoint": self.label})
+                    raise CircuitOpen(f"Flowise endpoint {self.label} is unavailable", remaining)
+                self._transition(HALF_OPEN, f"{self.open_seconds:.0f}s elapsed, trying one call")
+            if self.state == HALF_OPEN:
+                if self._trial:
+                    instrumentation.registry.inc("flowise_circuit_rejected_total", {"endpoint": self.label})
+                    raise CircuitOpen(f"Flowise endpoint {self.label} is being probed", self.open_seconds)
+                self._trial = True
+                return True
+            return False
+
+    def record(self, trial, failed, elapsed=None):
+        """The outcome of an allowed call; ``elapsed`` None leaves latency out of it."""
+        now = time.monotonic()
+        slow = elapsed is not None and elapsed > self.slow_seconds
+        with self._lock:
+            if trial:
+                self._trial = False
+                if failed:
+                    self.opened_at = now
+                    self._transition(OPEN, "trial call failed")
+                else:
+                    self._calls.clear()
+                    self._transition(CLOSED, "trial call succeeded")
+                return
+            self._calls.append((now, failed, slow))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            if self.state != CLOSED or len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slow_calls = sum(1 for _, _, s in self._calls if s)
+            if failures >= self.error_rate * len(self._calls):
+                reason = f"{failures} of the last {len(self._calls)} calls failed"
+            elif slow_calls >= self.slow_rate * len(self._calls):
+                reason = f"{slow_calls} of the last {len(self._calls)} calls took over {self.slow_seconds:.0f}s"
+            else:
+                return
+            self.opened_at = now
+            self._calls.clear()
+            self._transition(OPEN, reason)
+
+    def abandon(self, trial):
+        """An allowed call ended without an outcome (e.g. the student cancelled it)."""
+        if trial:
+            with self._lock:
+                self._trial = False
+
+    def stats(self):
+        with self._lock:
+            return {"state": STATE_VALUES[self.state], "calls": len(self._calls)}
@@ -0,0 +1,141 @@
+"""Token-budgeted compaction of the Career Advice profile payload.
+
+The advice bot receives every section's conversation (``"\\nUser: ...\\nAI: ..."``
+turns appended by process_user_input), which grows without bound over a
+session. The compactor keeps the most recent turns of each section verbatim,
+collapses older turns into a short extractive summary (cached per section,
+keyed by the content it summarises) and, if the result is still over the
+token budget, keeps fewer recent turns until it fits.
+
+Token counts use tiktoken when it is installed and a word/punctuation
+approximation otherwise.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # not installed, or the encoding files cannot be fetched
+    _encoding = None
+
+TOKEN_BUDGET = int(os.environ.get("ADVICE_PROFILE_TOKEN_BUDGET", "3000"))
+KEEP_RECENT_TURNS = int(os.environ.get("ADVICE_KEEP_RECENT_TURNS", "2"))
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+Turn = namedtuple("Turn", "user ai")
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(_TOKEN_RE.findall(text))
+
+
+def parse_turns(text):
+    """Split a conversation summary back into turns (inverse of format_turns)."""
+    turns = []
+    for chunk in text.split("\nUser: ")[1:]:
+        user, _, ai = chunk.partition("\nAI: ")
+        turns.append(Turn(user, ai))
+    return turns
+
+
+def format_turns(turns):
+    return "".join(f"\nUser: {turn.user}\nAI: {turn.ai}" for turn in turns)
+
+
+def _gist(text, max_words=25):
+    text = " ".join(text.split())
+    sentence = _SENTENCE_END_RE.split(text, maxsplit=1)[0]
+    words = sentence.split(" ")
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "..."
+    return sentence
+
+
+def summarize_turns(turns):
+    lines = [f"- Asked: {_gist(turn.user, 15)} | Answer: {_gist(turn.ai)}" for turn in turns]
+    return "Earlier in this conversation:\n" + "\n".join(lines)
+
+
+class ContextCompactor:
+    def __init__(self, token_budget=TOKEN_BUDGET, keep_recent=KEEP_RECENT_TURNS, max_cached_summaries=512):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _summary_for(self, title, older):
+        key = (title, hashlib.sha256(format_turns(older).encode()).hexdigest())
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+                return summary
+        summary = summarize_turns(older)
+        with self._lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _compact_section(self, title, text, keep):
+        turns = parse_turns(text)
+        if len(turns) <= keep:
+            return text
+        older, recent = turns[:len(turns) - keep], turns[len(turns) - keep:]
+        return self._summary_for(title, older) + format_turns(recent)
+
+    def compact(self, sections):
+        """Return (profile_text, stats) for a {title: conversation} mapping.
+
+        ``stats`` compares against the uncompacted profile as it used to be
+        sent: twice, once in overrideConfig and again in the first message.
+        """
+        sections = {title: text for title, text in sections.items() if text}
+        raw = "\n\n".join(f"{title}:\n{text}" for title, text in sections.items())
+
+        text = raw
+        for keep in range(self.keep_recent, -1, -1):
+            text = "\n\n".join(
+                f"{title}:\n{self._compact_section(title, body, keep)}" for title, body in sections.items()
+            )
+            if count_tokens(text) <= self.token_budget:
+                break
+        else:
+            tokens = count_tokens(text)
+            if tokens > self.token_budget:
+                # Even the summaries do not fit; keep the proportional head of the text
+                text = text[:len(text) * self.token_budget // tokens].rstrip() + "..."
+
+        raw_bytes = 2 * len(raw.encode())
+        raw_tokens = 2 * count_tokens(raw)
+        compact_bytes = len(text.encode())
+        compact_tokens = count_tokens(text)
+        stats = {
+            "raw_bytes": raw_bytes,
+            "raw_tokens": raw_tokens,
+            "bytes": compact_bytes,
+            "tokens": compact_tokens,
+            "bytes_saved": raw_bytes - compact_bytes,
+            "tokens_saved": raw_tokens - compact_tokens,
+        }
+        return text, stats
+
+
+def log_savings(stats):
+    logging.info(
+        f"Advice profile compacted to {stats['tokens']} tokens / {stats['bytes']} bytes, "
+        f"saved {stats['tokens_saved']} tokens / {stats['bytes_saved']} bytes"
+    )
+
+
+profile_compactor = ContextCompactor()
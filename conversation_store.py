@@ -0,0 +1,242 @@
+"""Compact per-session storage for chat history.
+
+Each session used to keep, per chatbot, a list of ``{"role", "content"}``
+dicts plus a second copy of the whole conversation as one ever-growing
+string in ``conversation_results`` (and the resume text a third time inside
+the first message). A ConversationStore keeps one list of slotted Message
+records per chatbot instead:
+
+* roles are interned strings, and text attached to a message (the resume)
+  is held by reference rather than copied into it,
+* the ``"\\nUser: ...\\nAI: ..."`` summary the Career Advice page needs is
+  derived from the messages when asked for, never stored alongside them,
+* beyond ``max_messages`` the oldest messages are spilled to a JSONL file on
+  disk, in a directory of the store's own that is removed when the store is
+  collected,
+* assistant messages that only report a failure (Flowise unavailable or
+  busy) are flagged ``error`` and left out of the summary,
+* ``nbytes()`` reports the approximate memory the session's history uses,
+* ``snapshot()`` / ``restore()`` convert the history to and from plain
+  JSON-able data for session_persistence; ``version`` changes on every
+  write so callers can tell whether a snapshot is stale.
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+import weakref
+
+import instrumentation
+
+MAX_IN_MEMORY_MESSAGES = int(os.environ.get("CHAT_MAX_IN_MEMORY_MESSAGES", "200"))
+SPILL_DIR = os.environ.get("CHAT_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "studentcareer-chat-spill")
+
+USER = sys.intern("user")
+ASSISTANT = sys.intern("assistant")
+
+
+class Message:
+    __slots__ = ("role", "content", "attachment", "error")
+
+    def __init__(self, role, content, attachment=None, error=False):
+        self.role = sys.intern(role)
+        self.content = content
+        self.attachment = attachment
+        self.error = error
+
+    @property
+    def text(self):
+        """The full text, with any attachment, as it was sent to Flowise."""
+        if self.attachment:
+            return f"{self.content}\n\n{self.attachment}"
+        return self.content
+
+    def to_json(self):
+        fields = [self.role, self.content, self.attachment]
+        if self.error:
+            fields.append(True)
+        return json.dumps(fields)
+
+    @classmethod
+    def from_json(cls, line):
+        return cls(*json.loads(line))
+
+
+class Conversation:
+    __slots__ = ("messages", "spilled", "spill_path")
+
+    def __init__(self, spill_path):
+        self.messages = []
+        self.spilled = 0
+        self.spill_path = spill_path
+
+
+def _pairs_summary(messages):
+    parts = []
+    for previous, message in zip(messages, messages[1:]):
+        if previous.role is USER and message.role is ASSISTANT and not message.error:
+            parts.append(f"\nUser: {previous.text}\nAI: {message.text}")
+    return "".join(parts)
+
+
+class ConversationStore:
+    def __init__(self, session_id, max_messages=MAX_IN_MEMORY_MESSAGES, spill_dir=SPILL_DIR):
+        self.session_id = session_id
+        self.max_messages = max_messages
+        # Per store, not per session: two live stores for one sid (a second tab, a
+        # reconnect) must not share spill files or remove each other's
+        self.spill_dir = os.path.join(spill_dir, uuid.uuid4().hex)
+        self._conversations = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        _stores.add(self)
+
+    def _conversation(self, title):
+        conversation = self._conversations.get(title)
+        if conversation is None:
+            spill_path = os.path.join(self.spill_dir, f"{len(self._conversations)}.jsonl")
+            conversation = self._conversations[title] = Conversation(spill_path)
+            self.version += 1
+        return conversation
+
+    def __contains__(self, title):
+        return title in self._conversations
+
+    def messages(self, title):
+        """The in-memory (most recent) messages of ``title``."""
+        conversation = self._conversations.get(title)
+        return conversation.messages if conversation else []
+
+    def spilled_count(self, title):
+        conversation = self._conversations.get(title)
+        return conversation.spilled if conversation else 0
+
+    def start(self, title):
+        with self._lock:
+            self._conversation(title)
+
+    def append(self, title, role, content, attachment=None, error=False):
+        with self._lock:
+            conversation = self._conversation(title)
+            conversation.messages.append(Message(role, content, attachment, error))
+            self.version += 1
+            if len(conversation.messages) > self.max_messages:
+                self._spill(conversation)
+
+    def _spill(self, conversation):
+        # Caller holds self._lock. Spill down to half the limit so spilling
+        # happens once every max_messages / 2 appends, not on every one.
+        keep = self.max_messages // 2
+        old, conversation.messages = conversation.messages[:-keep], conversation.messages[-keep:]
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(conversation.spill_path, "a", encoding="utf-8") as f:
+                f.writelines(message.to_json() + "\n" for message in old)
+            conversation.spilled += len(old)
+        except OSError as e:
+            logging.warning(f"Could not spill chat history to {conversation.spill_path}: {e}")
+            conversation.messages = old + conversation.messages
+
+    def _load_spilled(self, conversation):
+        if not conversation.spilled:
+            return []
+        try:
+            with open(conversation.spill_path, encoding="utf-8") as f:
+                return [Message.from_json(line) for line in f]
+        except OSError as e:
+            logging.warning(f"Could not read spilled chat history {conversation.spill_path}: {e}")
+            return []
+
+    def all_messages(self, title):
+        """Every message of ``title``, reading spilled ones back from disk."""
+        with self._lock:
+            conversation = self._conversations.get(title)
+            if conversation is None:
+                return []
+            return self._load_spilled(conversation) + conversation.messages
+
+    def clear(self, title):
+        with self._lock:
+            conversation = self._conversations.get(title)
+            if conversation is None:
+                return
+            conversation.messages = []
+            self.version += 1
+            if conversation.spilled:
+                conversation.spilled = 0
+                try:
+                    os.remove(conversation.spill_path)
+                except OSError:
+                    pass
+
+    def summary(self, title):
+        """The conversation as ``"\\nUser: ...\\nAI: ..."`` turns (answered turns only)."""
+        return _pairs_summary(self.all_messages(title))
+
+    def summaries(self):
+        """{title: summary} for every conversation with at least one answered turn."""
+        titles = list(self._conversations)
+        return {title: text for title in titles if (text := self.summary(title))}
+
+    def snapshot(self):
+        """Every conversation as JSON-able data; each attachment is stored once."""
+        attachments = []
+        indexes = {}
+        conversations = {}
+        for title in list(self._conversations):
+            rows = conversations[title] = []
+            for message in self.all_messages(title):
+                index = None
+                if message.attachment is not None:
+                    index = indexes.get(id(message.attachment))
+                    if index is None:
+                        index = indexes[id(message.attachment)] = len(attachments)
+                        attachments.append(message.attachment)
+                rows.append([message.role, message.content, index, True] if message.error
+                            else [message.role, message.content, index])
+        return {"conversations": conversations, "attachments": attachments}
+
+    @classmethod
+    def restore(cls, session_id, data, **kwargs):
+        """A store holding the history of a ``snapshot()``."""
+        store = cls(session_id, **kwargs)
+        attachments = data.get("attachments", [])
+        for title, rows in data.get("conversations", {}).items():
+            store.start(title)
+            for role, content, index, *error in rows:
+                store.append(title, role, content, attachments[index] if index is not None else None, bool(error))
+        return store
+
+    def nbytes(self):
+        """Approximate bytes held in memory by this session's history."""
+        size = sys.getsizeof(self._conversations)
+        seen = set()
+        with self._lock:
+            for conversation in self._conversations.values():
+                size += sys.getsizeof(conversation) + sys.getsizeof(conversation.messages)
+                for message in conversation.messages:
+                    size += sys.getsizeof(message) + sys.getsizeof(message.content)
+                    # Attachments are shared with session state; count each once
+                    if message.attachment is not None and id(message.attachment) not in seen:
+                        seen.add(id(message.attachment))
+                        size += sys.getsizeof(message.attachment)
+        return size
+
+
+_stores = weakref.WeakSet()
+
+
+def _collect_metrics():
+    stores = list(_stores)
+    return [
+        ("conversation_store_sessions", {}, len(stores)),
+        ("conversation_store_bytes", {}, sum(store.nbytes() for store in stores)),
+    ]
+
+
+instrumentation.registry.register_collector("conversation_store", _collect_metrics)
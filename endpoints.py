@@ -0,0 +1,406 @@
+"""Routing of Flowise calls across several backends per chatbot.
+
+main.py names each chatbot's chatflow by one URL (the "route"). By default
+that URL is the only backend, exactly as before. FLOWISE_ENDPOINTS (inline
+JSON) or FLOWISE_ENDPOINTS_FILE (path to a JSON file) can list several
+backends per route, keyed by the route names main.py registers::
+
+    {"resume": ["https://a.example/api/v1/prediction/<id>",
+                "https://b.example/api/v1/prediction/<id>"]}
+
+A single URL may be given as a string; other values are ignored with an error.
+
+For every call a backend is picked by least outstanding requests among the
+healthy ones. A backend is taken out of rotation after FLOWISE_EJECT_AFTER
+consecutive transport or 5xx failures and put back when a background probe
+of its ``/api/v1/ping`` succeeds (every FLOWISE_HEALTH_INTERVAL seconds,
+only for routes with more than one backend). A connection failure fails
+over to the next backend.
+
+With FLOWISE_HEDGE=1, a blocking call that has not answered after the
+route's recent p95 latency (FLOWISE_HEDGE_DELAY until enough samples) is
+sent to a second backend too, and the first answer wins. The loser runs to
+completion in the background; its answer is discarded. A connection failure
+with no other attempt in flight fails over as without hedging. Streams are not
+hedged, since tokens from two backends cannot be merged.
+
+Every routed call first asks its route's circuit breaker (circuit_breaker.py),
+which refuses calls at once while the route is failing, then holds one
+admission slot (admission.py) while it runs. Cache keys and trace labels keep using the route URL, whichever backend
+answers.
+"""
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import circuit_breaker
+import instrumentation
+from admission import AdmissionRejected, admission_controller
+
+HEALTH_INTERVAL = float(os.environ.get("FLOWISE_HEALTH_INTERVAL", "15"))
+HEALTH_TIMEOUT = float(os.environ.get("FLOWISE_HEALTH_TIMEOUT", "3"))
+EJECT_AFTER = int(os.environ.get("FLOWISE_EJECT_AFTER", "2"))
+HEDGE = os.environ.get("FLOWISE_HEDGE", "0") == "1"
+HEDGE_DELAY = float(os.environ.get("FLOWISE_HEDGE_DELAY", "3"))
+HEDGE_WORKERS = int(os.environ.get("FLOWISE_HEDGE_WORKERS", "32"))
+# Latency samples kept per route for the hedge delay, and how many are needed
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+
+def _load_config():
+    path = os.environ.get("FLOWISE_ENDPOINTS_FILE")
+    text = os.environ.get("FLOWISE_ENDPOINTS")
+    try:
+        if path:
+            with open(path, encoding="utf-8") as f:
+                return _check_config(json.load(f))
+        if text:
+            return _check_config(json.loads(text))
+    except (OSError, ValueError) as e:
+        logging.error(f"Ignoring Flowise endpoint config: {e}")
+    return {}
+
+
+def _check_config(config):
+    """``config`` with every route's backends as a list of URLs; a lone URL is wrapped."""
+    if not isinstance(config, dict):
+        raise ValueError(f"expected an object of route names, got {type(config).__name__}")
+    checked = {}
+    for name, urls in config.items():
+        if isinstance(urls, str):
+            urls = [urls]
+        if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+            logging.error(f"Ignoring Flowise endpoints for {name!r}: expected a list of URLs")
+            continue
+        checked[name] = urls
+    return checked
+
+
+def _is_failure(error):
+    import requests
+
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class Backend:
+    def __init__(self, url):
+        self.url = url
+        parts = urlsplit(url)
+        self.ping_url = f"{parts.scheme}://{parts.netloc}/api/v1/ping"
+        self.outstanding = 0
+        self.failures = 0
+        self.healthy = True
+
+
+class EndpointPool:
+    def __init__(self, route_url, backend_urls):
+        self.route_url = route_url
+        self.backends = [Backend(url) for url in backend_urls]
+        self.label = instrumentation.endpoint_label(route_url)
+        self.breaker = circuit_breaker.CircuitBreaker(self.label) if circuit_breaker.ENABLED else None
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def acquire(self, exclude=()):
+        """Reserve the healthy backend with the fewest requests in flight."""
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude]
+            healthy = [b for b in candidates if b.healthy]
+            # If every backend looks down, try them anyway rather than fail outright
+            candidates = healthy or candidates
+            if not candidates:
+                return None
+            # Rotate the start so ties do not always go to the first backend
+            self._next = (self._next + 1) % len(candidates)
+            candidates = candidates[self._next:] + candidates[:self._next]
+            backend = min(candidates, key=lambda b: b.outstanding)
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend, elapsed=None, error=None):
+        with self._lock:
+            backend.outstanding -= 1
+            if error is None:
+                backend.failures = 0
+                backend.healthy = True
+                if elapsed is not None:
+                    self._latencies.append(elapsed)
+            elif _is_failure(error):
+                backend.failures += 1
+                if backend.healthy and backend.failures >= EJECT_AFTER:
+                    backend.healthy = False
+                    logging.warning(f"Flowise backend {backend.url} ejected after {backend.failures} failures")
+
+    def hedge_delay(self):
+        with self._lock:
+            if len(self._latencies) < MIN_LATENCY_SAMPLES:
+                return HEDGE_DELAY
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def set_health(self, backend, healthy):
+        with self._lock:
+            if healthy and not backend.healthy:
+                logging.info(f"Flowise backend {backend.url} is healthy again")
+            backend.healthy = healthy
+            if healthy:
+                backend.failures = 0
+
+
+class EndpointRegistry:
+    def __init__(self, config=None):
+        self.config = _load_config() if config is None else _check_config(config)
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def set_routes(self, routes):
+        """Register ``{name: url}`` routes; config entries for ``name`` replace the URL's backend."""
+        with self._lock:
+            for name, url in routes.items():
+                if url not in self._pools:
+                    self._pools[url] = EndpointPool(url, self.config.get(name) or [url])
+        self._start_prober()
+
+    def pool_for(self, url):
+        with self._lock:
+            pool = self._pools.get(url)
+            if pool is None:
+                pool = self._pools[url] = EndpointPool(url, [url])
+            return pool
+
+    def pools(self):
+        with self._lock:
+            return list(self._pools.values())
+
+    def _start_prober(self):
+        with self._lock:
+            if self._prober is not None or HEALTH_INTERVAL <= 0:
+                return
+            if not any(len(pool.backends) > 1 for pool in self._pools.values()):
+                return
+            self._prober = threading.Thread(target=self._probe_forever, name="flowise-health", daemon=True)
+            self._prober.start()
+
+    def _probe_forever(self):
+        while True:
+            self.probe()
+            time.sleep(HEALTH_INTERVAL)
+
+    def probe(self):
+        import flowise_client
+
+        session = flowise_client.get_session()
+        for pool in self.pools():
+            if len(pool.backends) < 2:
+                continue
+            for backend in pool.backends:
+                try:
+                    healthy = session.get(backend.ping_url, timeout=HEALTH_TIMEOUT).ok
+                except Exception:
+                    healthy = False
+                pool.set_health(backend, healthy)
+
+    def stats(self):
+        gauges = []
+        for pool in self.pools():
+            if pool.breaker is not None:
+                for name, value in pool.breaker.stats().items():
+                    gauges.append((f"flowise_circuit_{name}", {"endpoint": pool.label}, value))
+            for backend in pool.backends:
+                labels = {"endpoint": pool.label, "backend": urlsplit(backend.url).netloc}
+                gauges.append(("flowise_backend_outstanding", labels, backend.outstanding))
+                gauges.append(("flowise_backend_healthy", labels, int(backend.healthy)))
+        return gauges
+
+
+endpoint_registry = EndpointRegistry()
+instrumentation.registry.register_collector("endpoints", endpoint_registry.stats)
+
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = concurrent.futures.ThreadPoolExecutor(HEDGE_WORKERS, thread_name_prefix="flowise-hedge")
+        return _hedge_pool
+
+
+def _attempt(pool, backend, payload, timeout):
+    import flowise_client
+
+    start = time.perf_counter()
+    try:
+        result = flowise_client.post_json(backend.url, payload, timeout)
+    except Exception as e:
+        pool.release(backend, error=e)
+        raise
+    pool.release(backend, elapsed=time.perf_counter() - start)
+    return result
+
+
+def _post_failover(pool, payload, timeout):
+    import requests
+
+    tried = []
+    while True:
+        backend = pool.acquire(exclude=tried)
+        if backend is None:
+            raise last_error
+        tried.append(backend)
+        try:
+            return _attempt(pool, backend, payload, timeout)
+        except requests.exceptions.ConnectionError as e:
+            # Nothing reached Flowise; another backend may be up
+            last_error = e
+            logging.warning(f"Flowise backend {backend.url} unreachable, failing over: {e}")
+
+
+def _post_hedged(pool, payload, timeout):
+    import requests
+
+    executor = _executor()
+    tried = []
+    futures = {}
+
+    def send(role):
+        backend = pool.acquire(exclude=tried)
+        if backend is None:
+            return None
+        tried.append(backend)
+        future = executor.submit(contextvars.copy_context().run, _attempt, pool, backend, payload, timeout)
+        futures[future] = (role, backend)
+        return future
+
+    pending = {send("primary")}
+    hedge_at = time.monotonic() + pool.hedge_delay()
+    hedged = False
+    while pending:
+        wait = None if hedged else max(0.0, hedge_at - time.monotonic())
+        done, pending = concurrent.futures.wait(pending, timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED)
+        if not done:
+            hedged = True
+            hedge = send("hedge")
+            if hedge is not None:
+                instrumentation.registry.inc("flowise_hedged_requests_total", {"endpoint": pool.label})
+                pending.add(hedge)
+            continue
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if hedged and len(futures) > 1:
+                    labels = {"endpoint": pool.label, "winner": futures[future][0]}
+                    instrumentation.registry.inc("flowise_hedge_wins_total", labels)
+                return future.result()
+        if pending:
+            continue
+        if not isinstance(error, requests.exceptions.ConnectionError):
+            break
+        # Nothing reached Flowise and nothing else is in flight; another backend may be up
+        backend = futures[future][1]
+        retry = send("primary")
+        if retry is None:
+            break
+        logging.warning(f"Flowise backend {backend.url} unreachable, failing over: {error}")
+        pending.add(retry)
+        hedge_at = time.monotonic() + pool.hedge_delay()
+    raise error
+
+
+@contextlib.contextmanager
+def _circuit(pool, timed=True):
+    """Run the body if ``pool``'s breaker allows it (else CircuitOpen) and report how it went."""
+    breaker = pool.breaker
+    if breaker is None:
+        yield
+        return
+    trial = breaker.allow()
+    start = time.perf_counter()
+    try:
+        yield
+    except AdmissionRejected:
+        # Refused locally; says nothing about the endpoint
+        breaker.abandon(trial)
+        raise
+    except Exception as e:
+        # 4xx answers and Flowise error events still mean the endpoint is up
+        breaker.record(trial, _is_failure(e))
+        raise
+    except BaseException:
+        # e.g. a stream closed early because the student cancelled
+        breaker.abandon(trial)
+        raise
+    breaker.record(trial, False, time.perf_counter() - start if timed else None)
+
+
+def post_json(api_url, payload, timeout=None):
+    """flowise_client.post_json, routed to one of ``api_url``'s backends."""
+    import flowise_client
+
+    # Serialized once for every failover and hedge attempt
+    payload = flowise_client.prepare(payload)
+    pool = endpoint_registry.pool_for(api_url)
+    with _circuit(pool), admission_controller.slot():
+        if HEDGE and len(pool.backends) > 1:
+            return _post_hedged(pool, payload, timeout)
+        return _post_failover(pool, payload, timeout)
+
+
+def stream_prediction(api_url, payload, timeout=None):
+    """flowise_client.stream_prediction, routed to one of ``api_url``'s backends.
+
+    Fails over to another backend only if the connection fails before the
+    first token; after that the stream is tied to its backend. The admission
+    slot is held until the stream ends. Stream durations depend on the answer's
+    length, so they do not count towards the breaker's slow calls.
+    """
+    import flowise_client
+
+    payload = flowise_client.prepare(payload)
+    pool = endpoint_registry.pool_for(api_url)
+    with _circuit(pool, timed=False), admission_controller.slot():
+        yield from _stream_failover(pool, payload, timeout)
+
+
+def _stream_failover(pool, payload, timeout):
+    import flowise_client
+    import requests
+
+    tried = []
+    while True:
+        backend = pool.acquire(exclude=tried)
+        if backend is None:
+            raise last_error
+        tried.append(backend)
+        received = False
+        try:
+            for token in flowise_client.stream_prediction(backend.url, payload, timeout):
+                received = True
+                yield token
+        except requests.exceptions.ConnectionError as e:
+            pool.release(backend, error=e)
+            if received:
+                raise
+            last_error = e
+            logging.warning(f"Flowise backend {backend.url} unreachable, failing over: {e}")
+            continue
+        except BaseException as e:
+            pool.release(backend, error=e)
+            raise
+        # Stream durations depend on answer length; keep them out of the hedge delay
+        pool.release(backend)
+        return
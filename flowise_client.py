@@ -0,0 +1,311 @@
+"""Shared HTTP client for the Flowise prediction API.
+
+Streamlit re-executes main.py on every interaction, so the client lives at
+module level: one requests.Session per process, with keep-alive connections
+pooled per host, explicit connect/read timeouts and a jittered retry policy.
+All settings can be overridden through FLOWISE_* environment variables.
+
+Payloads are serialized once into a PreparedPayload, with orjson when it is
+installed, and bodies of at least FLOWISE_GZIP_MIN_BYTES are sent gzipped
+when FLOWISE_GZIP_REQUESTS=1 (Flowise's Express body parser inflates them).
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+import instrumentation
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FlowiseStreamError(Exception):
+    """Flowise reported an error event in the middle of a streamed prediction."""
+
+
+class ClientConfig:
+    def __init__(self, **overrides):
+        self.connect_timeout = float(os.environ.get("FLOWISE_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.environ.get("FLOWISE_READ_TIMEOUT", "120"))
+        # Number of hosts to keep pools for, and keep-alive connections per host
+        self.pool_connections = int(os.environ.get("FLOWISE_POOL_CONNECTIONS", "4"))
+        self.pool_maxsize = int(os.environ.get("FLOWISE_POOL_MAXSIZE", "32"))
+        self.max_retries = int(os.environ.get("FLOWISE_MAX_RETRIES", "3"))
+        self.backoff_factor = float(os.environ.get("FLOWISE_BACKOFF_FACTOR", "0.5"))
+        self.backoff_jitter = float(os.environ.get("FLOWISE_BACKOFF_JITTER", "0.5"))
+        self.gzip_requests = os.environ.get("FLOWISE_GZIP_REQUESTS", "0") == "1"
+        self.gzip_min_bytes = int(os.environ.get("FLOWISE_GZIP_MIN_BYTES", "16384"))
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise TypeError(f"Unknown client setting: {name}")
+            setattr(self, name, value)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+
+# Render's edge answers 503 while the Flowise dyno is starting or has no
+# instance to route to: the prediction never reached Flowise, so resending the
+# POST is safe. 502 and 504 are not retried: the proxy may already have
+# forwarded the request (504 means it did and gave up waiting), and a resent
+# prediction would run, and be paid for, twice.
+RETRY_STATUSES = frozenset({503})
+
+_lock = threading.Lock()
+_config = ClientConfig()
+_session = None
+
+
+def _build_retry(config):
+    # Connection failures are always retried (nothing was sent). Read errors are
+    # not: once Flowise has the question, the LLM call may already be running.
+    return Retry(
+        total=config.max_retries,
+        connect=config.max_retries,
+        read=0,
+        status=config.max_retries,
+        other=0,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "POST"}),
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=config.backoff_factor,
+        backoff_jitter=config.backoff_jitter,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+
+
+def _timed_new_conn(new_conn):
+    # urllib3's own _new_conn, so its connect loop over every resolved address
+    # is kept; the phase covers DNS resolution and the TCP connect together
+    start = time.perf_counter()
+    sock = new_conn()
+    trace = instrumentation.current_trace()
+    if trace is not None:
+        trace.connect = time.perf_counter() - start
+    return sock
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        return _timed_new_conn(super()._new_conn)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        return _timed_new_conn(super()._new_conn)
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        trace = instrumentation.current_trace()
+        if trace is not None and trace.connect is not None:
+            trace.tls = time.perf_counter() - start - trace.connect
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _build_session(config):
+    session = requests.Session()
+    adapter = _TimedAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        max_retries=_build_retry(config),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session(_config)
+    return _session
+
+
+def get_config():
+    return _config
+
+
+def configure(**overrides):
+    """Replace the client settings and drop the pooled connections."""
+    global _config, _session
+    with _lock:
+        _config = ClientConfig(**overrides)
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def close():
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class PreparedPayload:
+    """A prediction payload serialized once, however many times it is sent."""
+
+    __slots__ = ("payload", "body", "_encoded")
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.body = dumps(payload)
+        self._encoded = {}
+
+    def _streaming_body(self):
+        if "streaming" in self.payload or len(self.body) < 3:
+            return dumps(dict(self.payload, streaming=True))
+        # Splice the flag in rather than serializing a large payload again
+        return b'{"streaming":true,' + self.body[1:]
+
+    def encode(self, streaming=False, config=None):
+        """(body, headers) to send, compressed if the client config asks for it."""
+        config = config or _config
+        key = (streaming, config.gzip_requests and config.gzip_min_bytes)
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            body = self._streaming_body() if streaming else self.body
+            headers = {"Content-Type": "application/json"}
+            if config.gzip_requests and len(body) >= config.gzip_min_bytes:
+                body = gzip.compress(body, compresslevel=5)
+                headers["Content-Encoding"] = "gzip"
+            encoded = self._encoded[key] = (body, headers)
+        return encoded
+
+
+def prepare(payload):
+    """``payload`` as a PreparedPayload (returned as is if it already is one)."""
+    return payload if isinstance(payload, PreparedPayload) else PreparedPayload(payload)
+
+
+def post_json(api_url, payload, timeout=None):
+    """POST ``payload`` (a dict or PreparedPayload) to a Flowise prediction URL
+    and return the decoded JSON.
+
+    Raises requests.exceptions.RequestException on transport or HTTP errors.
+    """
+    body, headers = prepare(payload).encode()
+    trace = instrumentation.current_trace()
+    start = time.perf_counter()
+    # stream=True returns once the headers are in, which gives us TTFB
+    response = get_session().post(
+        api_url, data=body, headers=headers, timeout=timeout or _config.timeout, stream=True
+    )
+    if trace is not None:
+        trace.ttfb = time.perf_counter() - start
+        trace.request_bytes = len(response.request.body or b"")
+        trace.response_bytes = len(response.content)
+    response.raise_for_status()
+    logging.debug(f"Flowise {api_url} answered {response.status_code} in {response.elapsed.total_seconds():.3f}s")
+    try:
+        return loads(response.content)
+    except ValueError as e:
+        # e.g. Render's HTML wake-up page. Raised as a RequestException, which callers
+        # handle, as response.json() did before the body was decoded here.
+        raise requests.exceptions.InvalidJSONError(
+            f"Flowise {api_url} answered with invalid JSON: {e}", response=response
+        ) from e
+
+
+def _iter_sse_events(lines):
+    """Yield the ``data:`` payload of each server-sent event in ``lines``."""
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        if line.startswith("data:"):
+            data.append(line[5:].lstrip(" "))
+    if data:
+        yield "\n".join(data)
+
+
+def stream_prediction(api_url, payload, timeout=None):
+    """Stream a Flowise prediction, yielding answer tokens as they arrive.
+
+    Flowise answers ``"streaming": true`` requests with server-sent events of
+    the form ``data: {"event": "token", "data": "..."}``. Chatflows that cannot
+    stream reply with plain JSON instead, in which case the whole answer is
+    yielded as a single token.
+    """
+    body, headers = prepare(payload).encode(streaming=True)
+    response = get_session().post(
+        api_url,
+        data=body,
+        headers=dict(headers, Accept="text/event-stream"),
+        stream=True,
+        timeout=timeout or _config.timeout,
+    )
+    trace = instrumentation.current_trace()
+    if trace is not None:
+        trace.ttfb = response.elapsed.total_seconds()
+        trace.request_bytes = len(response.request.body or b"")
+    with response:
+        response.raise_for_status()
+        if "text/event-stream" not in response.headers.get("Content-Type", ""):
+            yield response.json().get("text", "")
+            return
+        # SSE is always UTF-8; requests would otherwise assume ISO-8859-1 for text/*
+        response.encoding = "utf-8"
+        for data in _iter_sse_events(response.iter_lines(decode_unicode=True)):
+            if trace is not None:
+                trace.response_bytes = (trace.response_bytes or 0) + len(data)
+            try:
+                event = json.loads(data)
+            except ValueError:
+                # Older Flowise versions send bare tokens
+                yield data
+                continue
+            kind = event.get("event")
+            if kind == "token":
+                yield event.get("data", "")
+            elif kind == "error":
+                raise FlowiseStreamError(event.get("data") or "Flowise stream error")
+            elif kind == "end":
+                return
@@ -0,0 +1,141 @@
+"""The one path every chatbot question takes to Flowise.
+
+``build_flowise_payload`` maps a bot type to the overrideConfig field its
+chatflow reads (OVERRIDE_CONFIG_FIELDS), and ``query_flowise`` /
+``stream_flowise`` add the response cache, tracing, logging and error
+handling around the routed call. The payload is serialized exactly once,
+into a flowise_client.PreparedPayload; that body is what is hashed for the
+cache key, measured for the log line and sent (gzipped if configured) on
+every attempt, hedge and fallback.
+
+Failures the student should see are returned or yielded as a short error
+text rather than raised; ``on_error`` is called when that happens, so the
+caller can keep such answers out of the conversation summaries. Refused
+calls (AdmissionRejected, including an open circuit breaker) are raised.
+"""
+import logging
+
+import endpoints
+import instrumentation
+from admission import AdmissionRejected
+from response_cache import make_body_key, response_cache
+
+# Bot type -> overrideConfig field that carries its extra context
+OVERRIDE_CONFIG_FIELDS = {
+    "resume": "text",
+    "advice": "profile",
+}
+
+
+def build_flowise_payload(question, bot_type='general', override_config_text=None):
+    payload = {"question": question}
+    if override_config_text:
+        field = OVERRIDE_CONFIG_FIELDS.get(bot_type)
+        if field is None:
+            logging.warning(f"Bot type {bot_type!r} takes no overrideConfig; sending the question only")
+        else:
+            payload["overrideConfig"] = {field: override_config_text}
+    return payload
+
+
+def prepare_request(question, bot_type='general', override_config_text=None):
+    import flowise_client
+
+    return flowise_client.PreparedPayload(build_flowise_payload(question, bot_type, override_config_text))
+
+
+def _cached(api_url, prepared, bot_type, cache):
+    """(cache key or None, cached result or None)."""
+    if not (cache and response_cache.enabled_for(bot_type)):
+        return None, None
+    key = make_body_key(api_url, prepared.body)
+    cached = response_cache.get(api_url, prepared.payload, key=key)
+    instrumentation.set_cache_status("hit" if cached is not None else "miss")
+    if cached is not None:
+        logging.info(f"Serving cached response for {api_url}")
+    return key, cached
+
+
+def _query(prepared, api_url, bot_type, cache, on_error=None):
+    import requests
+
+    with instrumentation.trace("query_flowise", api_url):
+        try:
+            key, cached = _cached(api_url, prepared, bot_type, cache)
+            if cached is not None:
+                return cached
+            instrumentation.log_payload("Sending request to", api_url, prepared.body)
+            result = endpoints.post_json(api_url, prepared)
+            instrumentation.log_payload("Received response from", api_url, result)
+            if key is not None:
+                response_cache.set(api_url, prepared.payload, result, key=key)
+            return result
+        except requests.exceptions.RequestException as e:
+            instrumentation.record_error(e)
+            logging.error(f"Error in API request: {e}")
+            if on_error is not None:
+                on_error()
+            return {"text": f"An error occurred: {str(e)}"}
+        except AdmissionRejected:
+            # Left to the caller, which retries or tells the student (see admission.py)
+            raise
+        except Exception as e:
+            instrumentation.record_error(e)
+            logging.error(f"Unexpected error: {e}")
+            if on_error is not None:
+                on_error()
+            return {"text": "An unexpected error occurred"}
+
+
+def query_flowise(question, api_url, bot_type='general', override_config_text=None, cache=False, on_error=None):
+    return _query(prepare_request(question, bot_type, override_config_text), api_url, bot_type, cache, on_error)
+
+
+def stream_flowise(question, api_url, bot_type='general', override_config_text=None, cache=False, on_error=None):
+    # Yields answer tokens as Flowise produces them; falls back to the blocking
+    # request if Flowise answered but the stream failed before the first token.
+    # A backend that could not be reached or timed out would only fail again.
+    import requests
+    import flowise_client
+
+    prepared = prepare_request(question, bot_type, override_config_text)
+    received = False
+    fallback = False
+    with instrumentation.trace("stream_flowise", api_url):
+        try:
+            key, cached = _cached(api_url, prepared, bot_type, cache)
+            if cached is not None:
+                yield cached.get('text', '')
+                return
+            instrumentation.log_payload("Streaming request to", api_url, prepared.body)
+            tokens = []
+            for token in endpoints.stream_prediction(api_url, prepared):
+                received = True
+                tokens.append(token)
+                yield token
+            if key is not None and received:
+                response_cache.set(api_url, prepared.payload, {"text": ''.join(tokens)}, key=key)
+        except (requests.exceptions.RequestException, flowise_client.FlowiseStreamError) as e:
+            instrumentation.record_error(e)
+            logging.error(f"Error in streaming API request: {e}")
+            if received:
+                if on_error is not None:
+                    on_error()
+                yield f"\n\n*The response was interrupted: {str(e)}*"
+            elif isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                if on_error is not None:
+                    on_error()
+                yield f"An error occurred: {str(e)}"
+            else:
+                fallback = True
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            instrumentation.record_error(e)
+            logging.error(f"Unexpected error while streaming: {e}")
+            if on_error is not None:
+                on_error()
+            if not received:
+                yield "An unexpected error occurred"
+    if fallback:
+        yield _query(prepared, api_url, bot_type, cache, on_error).get('text', '')
@@ -0,0 +1,284 @@
+"""Request-scoped tracing and latency histograms for Flowise calls.
+
+Wrap a unit of work in ``trace(operation, api_url)``; while it is active,
+flowise_client fills in connect (DNS resolution included), TLS,
+time-to-first-byte and total timings, payload sizes, cache status and the
+error class, and on exit they are folded into in-memory histograms and
+counters. ``render_prometheus()``
+returns everything in the Prometheus text format, for the admin page or for
+a scrape endpoint started with ``start_http_server`` (FLOWISE_METRICS_PORT).
+
+Request and response bodies are no longer logged; ``log_payload`` logs
+their size instead, unless FLOWISE_LOG_BODIES=1.
+"""
+import bisect
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+
+LOG_BODIES = os.environ.get("FLOWISE_LOG_BODIES", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PHASES = ("connect", "tls", "ttfb", "total")
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound below which a fraction ``q`` of observations fall."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = {}
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def register_collector(self, name, collect):
+        """Add (or replace) a callable returning ``[(name, labels, value), ...]`` gauges."""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def histograms(self):
+        with self._lock:
+            return dict(self._histograms)
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def gauges(self):
+        gauges = []
+        with self._lock:
+            collectors = list(self._collectors.items())
+        for name, collect in collectors:
+            try:
+                gauges.extend(collect())
+            except Exception as e:
+                logging.warning(f"Metrics collector {name} failed: {e}")
+        return gauges
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+registry = Registry()
+
+
+class Trace:
+    __slots__ = (
+        "operation", "endpoint", "start", "connect", "tls", "ttfb", "total",
+        "request_bytes", "response_bytes", "cache", "error",
+    )
+
+    def __init__(self, operation, endpoint):
+        self.operation = operation
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.connect = self.tls = self.ttfb = self.total = None
+        self.request_bytes = self.response_bytes = None
+        self.cache = "bypass"
+        self.error = ""
+
+
+_current = contextvars.ContextVar("flowise_trace", default=None)
+
+
+def current_trace():
+    return _current.get()
+
+
+def endpoint_label(api_url):
+    # Prediction URLs end in the chatflow id; that keeps label cardinality bounded
+    return api_url.rstrip("/").rsplit("/", 1)[-1] if api_url else ""
+
+
+@contextlib.contextmanager
+def trace(operation, api_url=None):
+    current = Trace(operation, endpoint_label(api_url))
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        current.total = time.perf_counter() - current.start
+        _record(current)
+
+
+def record_error(error):
+    current = _current.get()
+    if current is not None:
+        current.error = type(error).__name__
+
+
+def set_cache_status(status):
+    current = _current.get()
+    if current is not None:
+        current.cache = status
+
+
+def _record(t):
+    labels = {"operation": t.operation, "endpoint": t.endpoint}
+    for phase in PHASES:
+        value = getattr(t, phase)
+        if value is not None:
+            registry.observe("flowise_phase_seconds", dict(labels, phase=phase), value)
+    if t.request_bytes is not None:
+        registry.observe("flowise_request_bytes", labels, t.request_bytes, SIZE_BUCKETS)
+    if t.response_bytes is not None:
+        registry.observe("flowise_response_bytes", labels, t.response_bytes, SIZE_BUCKETS)
+    registry.inc("flowise_requests_total", dict(labels, cache=t.cache, error=t.error))
+
+
+def log_payload(message, api_url, body):
+    # ``body`` may be an already serialized request body; never serialize it again
+    # just to measure it
+    if LOG_BODIES:
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", "replace")
+        logging.info(f"{message} {api_url}: {body}")
+    elif logging.getLogger().isEnabledFor(logging.INFO):
+        if isinstance(body, bytes):
+            logging.info(f"{message} {api_url} ({len(body)} bytes)")
+        else:
+            logging.info(f"{message} {api_url} ({len(str(body))} chars)")
+
+
+# --- exposition --------------------------------------------------------------
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def render_prometheus():
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), histogram in sorted(registry.histograms().items()):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    for (name, labels), value in sorted(registry.counters().items()):
+        declare(name, "counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    # Collectors report per object (e.g. per pool); each metric family must be one group
+    for name, labels, value in sorted(registry.gauges(), key=lambda gauge: gauge[0]):
+        declare(name, "gauge")
+        lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def latency_summary():
+    """Rows of p50/p95/p99 total latency per operation and endpoint, for display."""
+    rows = []
+    for (name, labels), histogram in sorted(registry.histograms().items()):
+        label_map = dict(labels)
+        if name != "flowise_phase_seconds" or label_map.get("phase") != "total":
+            continue
+        rows.append({
+            "operation": label_map["operation"],
+            "endpoint": label_map["endpoint"],
+            "count": histogram.count,
+            "mean_s": round(histogram.sum / histogram.count, 3),
+            "p50_s": histogram.quantile(0.5),
+            "p95_s": histogram.quantile(0.95),
+            "p99_s": histogram.quantile(0.99),
+        })
+    return rows
+
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serve /metrics on ``port`` from a daemon thread (once per process)."""
+    global _server, _server_started
+    with _server_lock:
+        if _server_started:
+            return _server
+        _server_started = True
+        # Imported here: http.server is slow to import and only operators enable this
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            # Another Streamlit worker on this host already serves the port
+            logging.warning(f"Metrics endpoint not started on port {port}: {e}")
+            return None
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
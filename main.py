@@ -1,163 +1,126 @@
-import requests
 import streamlit as st
 from streamlit_option_menu import option_menu
-import streamlit_card as stcard
-
-from pypdf import PdfReader
 
 import logging
+import os
+import time
+import uuid
+
+import endpoints
+import instrumentation
+import page_shell
+import rerun_profiler
+from admission import Overloaded, RateLimited, admission_controller, retry_when_busy
+from circuit_breaker import CircuitOpen
+from conversation_store import ConversationStore
+from flowise_requests import build_flowise_payload, query_flowise, stream_flowise
+from response_cache import response_cache
+from resume_cache import extraction_cache
+from session_persistence import session_persister, valid_session_id
+
+# Streamlit re-runs this script on every interaction, so heavy modules are
+# imported where they are first needed rather than here: requests and the
+# Flowise client inside the query functions (flowise_requests), pypdf (via
+# pdf_extract) on the Resume Review page. See benchmarks/bench_startup.py.
 
 logging.basicConfig(level=logging.INFO)
 
 st.set_page_config(page_title="Student Career Counselor", page_icon="🎓", layout="wide")
 
+# Opt-in per-phase timing of this rerun (RERUN_PROFILE, see rerun_profiler.py)
+PROFILE_PANEL = st.query_params.get("profile") == "1"
+rerun_profiler.begin(PROFILE_PANEL)
+
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .stApp {
-        background-color: #175676;
-    }
-    .big-font {
-        font-size: 24px !important;
-    }
-    .stButton>button {
-        background-color: #4169E1;
-        color: white;
-        border-radius: 10px;
-        padding: 10px 20px;
-        font-size: 18px;
-    }
-    .stTextInput>div>div>input {
-        border-radius: 10px;
-    }
-    .css-1d391kg {
-        padding: 2rem 1rem;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Initialize session state variables
-if 'conversation_results' not in st.session_state:
-    st.session_state.conversation_results = {
-        "Discover Your Strengths & Weaknesses": "",
-        "Resume Review": "",
-        "Academic Background": "",
-        "Career Advice": ""
-    }
-
-if 'resume_text' not in st.session_state:
-    st.session_state.resume_text = None
+with rerun_profiler.phase("stylesheet"):
+    page_shell.render_stylesheet()
+
+with rerun_profiler.phase("session"):
+    # Identifies this browser session to the background chat executor and, when
+    # sessions are persisted, across reconnects and replicas (the ?sid= parameter).
+    # The sid is a bearer secret: anyone with the URL gets the session's resume and
+    # history. Only ids already in the store are adopted from the URL, so a link
+    # with a made-up sid can't fix the id a student's data will be saved under.
+    if 'session_id' not in st.session_state:
+        sid = st.query_params.get("sid")
+        restored = None
+        if session_persister is not None and valid_session_id(sid):
+            restored = session_persister.load(sid)
+        if restored is None:
+            sid = uuid.uuid4().hex
+        st.session_state.session_id = sid
+        if restored is not None:
+            st.session_state.conversations, st.session_state.resume_text = restored
+        if session_persister is not None:
+            st.query_params["sid"] = sid
+
+    # Chat history of every chatbot in this session
+    if 'conversations' not in st.session_state:
+        st.session_state.conversations = ConversationStore(st.session_state.session_id)
+
+    # Initialize session state variables
+    if 'resume_text' not in st.session_state:
+        st.session_state.resume_text = None
+
+# Operator-only metrics page and Prometheus scrape endpoint
+ADMIN_METRICS_PAGE = os.environ.get("ADMIN_METRICS_PAGE", "0") == "1"
+if os.environ.get("FLOWISE_METRICS_PORT"):
+    instrumentation.start_http_server(int(os.environ["FLOWISE_METRICS_PORT"]))
+
+menu_options = [
+    "Home", 
+    "Strengths & Weaknesses", 
+    "Resume Review", 
+    "Academic Background", 
+    "Career Advice"
+]
+menu_icons = [
+    "house", 
+    "person-check", 
+    "file-earmark-text", 
+    "book", 
+    "briefcase"
+]
+if ADMIN_METRICS_PAGE:
+    menu_options.append("Metrics")
+    menu_icons.append("speedometer")
 
 # Sidebar for navigation using streamlit_option_menu
-with st.sidebar:
+with st.sidebar, rerun_profiler.phase("sidebar"):
     st.title("🎓 Career Counselor")
     selected = option_menu(
         menu_title=None,
-        options=[
-            "Home", 
-            "Strengths & Weaknesses", 
-            "Resume Review", 
-            "Academic Background", 
-            "Career Advice"
-        ],
-        icons=[
-            "house", 
-            "person-check", 
-            "file-earmark-text", 
-            "book", 
-            "briefcase"
-        ],
+        options=menu_options,
+        icons=menu_icons,
         menu_icon="cast",
         default_index=0,
     )
+rerun_profiler.set_page(selected)
 
-def query_flowise(question, api_url, bot_type='general', override_config_text=None):
-    try:
-        if override_config_text:
-            if bot_type == 'resume':
-                payload = {
-                    "question": question,
-                    "overrideConfig": {"text": override_config_text}
-                }
-            elif bot_type == 'advice':
-                payload = {
-                    "question": question,
-                    "overrideConfig": {"profile": override_config_text}
-                }
-        else:
-             payload = {
-                "question": question,
-            }
-
-        logging.info(f"Sending request to {api_url} with payload: {payload}")
-        response = requests.post(api_url, json=payload)
-        response.raise_for_status()  # Raises an HTTPError for bad responses
-        result = response.json()
-        logging.info(f"Received response: {result}")
-        return result
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error in API request: {e}")
-        return {"text": f"An error occurred: {str(e)}"}
-    except Exception as e:
-        logging.error(f"Unexpected error: {e}")
-        return {"text": "An unexpected error occurred"}
-    
-
-def query_flowise_resume(question, api_url, resume_text):
-    try:
-        payload = {
-            "question": question,
-            "overrideConfig": {"text": resume_text}
-        }
-        logging.info(f"Sending request to {api_url} with payload: {payload}")
-        response = requests.post(api_url, json=payload)
-        response.raise_for_status()  # Raises an HTTPError for bad responses
-        result = response.json()
-        logging.info(f"Received response: {result}")
-        return result
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error in API request: {e}")
-        return {"text": f"An error occurred: {str(e)}"}
-    except Exception as e:
-        logging.error(f"Unexpected error: {e}")
-        return {"text": "An unexpected error occurred"}
-    
-def query_flowise_advice(question, api_url, profile_info):
-    try:
-        payload = {
-            "question": question,
-            "overrideConfig": {"profile": profile_info}
-        }
-        logging.info(f"Sending request to {api_url} with payload: {payload}")
-        response = requests.post(api_url, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        logging.info(f"Received response: {result}")
-        return result
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error in API request: {e}")
-        return {"text": f"An error occurred: {str(e)}"}
-    except Exception as e:
-        logging.error(f"Unexpected error: {e}")
-        return {"text": "An unexpected error occurred"}
-
-def display_chatbot(title, description, api_url=None, bot_type='general', extra_data=None, initial_message=None):
+def display_chatbot(title, description, api_url=None, bot_type='general', extra_data=None, initial_message=None, initial_attachment=None):
     st.header(title)
     st.write(description)
+    conversations = st.session_state.conversations
 
     # Initialize chat history
-    if f"{title}_messages" not in st.session_state:
-        st.session_state[f"{title}_messages"] = []
-
-        # If there's an initial message (like the resume text), send it automatically
-        if initial_message:
-            # Process the initial message as if it's a user input
-            process_user_input(title, initial_message, api_url, bot_type, extra_data)
-    
+    if title not in conversations:
+        # If there's an initial message (like the resume text), send it automatically.
+        # Process it as if it's a user input; its answer only depends on the message
+        # and extra_data, so it may come from the cache. The chat only starts once it
+        # is accepted: if it is refused (rate limit, executor full), the next rerun
+        # sends it again.
+        if not initial_message or submit_user_input(
+            title, initial_message, api_url, bot_type, extra_data, cacheable=True, attachment=initial_attachment
+        ):
+            conversations.start(title)
+
     # Display chat messages from history
-    for message in st.session_state[f"{title}_messages"]:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    with rerun_profiler.phase("history"):
+        render_history(title, conversations)
+
+    # An answer still being generated in the background
+    if st.session_state.get(f"{title}_pending"):
+        show_pending_turn(title)
 
     # Placeholder for input field
     input_placeholder = st.empty()
@@ -167,8 +130,7 @@ def display_chatbot(title, description, api_url=None, bot_type='general', extra_
 
     # Send button logic
     if st.button("Send", key=f"{title}_send"):
-        if user_input:
-            process_user_input(title, user_input, api_url, bot_type, extra_data)
+        if user_input and submit_user_input(title, user_input, api_url, bot_type, extra_data):
             # Clear the input field after sending a message by re-rendering the placeholder
             input_placeholder.empty()
             st.rerun()
@@ -177,8 +139,9 @@ def display_chatbot(title, description, api_url=None, bot_type='general', extra_
     col1, col2 = st.columns([1, 1])
     with col1:
         if st.button("Clear Chat", key=f"{title}_clear"):
-            st.session_state[f"{title}_messages"] = []
-            st.session_state.conversation_results[title] = ""
+            cancel_pending_turn(title)
+            conversations.clear(title)
+            st.session_state.pop(f"{title}_history_pages", None)
             st.rerun()
     with col2:
         if st.button("Finish Conversation", key=f"{title}_finish"):
@@ -187,24 +150,277 @@ def display_chatbot(title, description, api_url=None, bot_type='general', extra_
 
 
 
-def process_user_input(title, user_input, api_url, bot_type, extra_data):
-    # Display user message
-    with st.chat_message("user"):
-        st.markdown(user_input)
-    st.session_state[f"{title}_messages"].append({"role": "user", "content": user_input})
+def render_message(message):
+    with st.chat_message(message.role):
+        st.markdown(message.content)
+        if message.attachment:
+            with st.expander("Attached text"):
+                st.text(message.attachment)
 
-    # Generate and display AI response
-    with st.chat_message("assistant"):
-        response = query_flowise(user_input, api_url, bot_type, override_config_text=extra_data)
-        ai_response = response.get('text', 'Sorry, I couldn\'t process that.')
-        st.markdown(ai_response)
-    st.session_state[f"{title}_messages"].append({"role": "assistant", "content": ai_response})
 
-    # Save the conversation summary
-    if title not in st.session_state.conversation_results:
-        st.session_state.conversation_results[title] = ""
-    st.session_state.conversation_results[title] += f"\nUser: {user_input}\nAI: {ai_response}"
+def render_history(title, conversations):
+    # Only the last CHAT_RENDER_RECENT messages get their own chat bubble; older
+    # ones are revealed a page at a time, each page as a single markdown element.
+    import chat_render
 
+    pages_key = f"{title}_history_pages"
+    pages_shown = st.session_state.get(pages_key, 0)
+    messages = conversations.messages(title)
+    spilled = conversations.spilled_count(title)
+    if spilled and pages_shown * RENDER_PAGE_SIZE > len(messages) - RENDER_RECENT_MESSAGES:
+        # Paged back past the messages kept in memory; read the spilled ones from disk
+        messages = conversations.all_messages(title)
+        spilled = 0
+    hidden, pages, recent = chat_render.split_history(messages, RENDER_RECENT_MESSAGES, pages_shown, RENDER_PAGE_SIZE)
+    if spilled or hidden:
+        st.caption(f"{spilled + hidden} earlier messages are hidden.")
+        if st.button("Show earlier messages", key=f"{title}_show_earlier"):
+            st.session_state[pages_key] = pages_shown + 1
+            st.rerun()
+    for page in pages:
+        with st.container(border=True):
+            st.markdown(chat_render.page_markdown(page))
+    for message in recent:
+        render_message(message)
+
+
+def compose_question(user_input, attachment=None):
+    # The text sent to Flowise; attachments are stored separately from the message
+    if attachment:
+        return f"{user_input}\n\n{attachment}"
+    return user_input
+
+
+def process_user_input(title, user_input, api_url, bot_type, extra_data, cacheable=False, attachment=None):
+    with instrumentation.trace("process_user_input", api_url), rerun_profiler.phase("flowise"):
+        if bot_type == 'advice' and 'advice_compaction' in st.session_state:
+            from context_compaction import log_savings
+            log_savings(st.session_state.advice_compaction)
+
+        # Display user message
+        st.session_state.conversations.append(title, "user", user_input, attachment)
+        render_message(st.session_state.conversations.messages(title)[-1])
+        user_input = compose_question(user_input, attachment)
+
+        # Generate and display AI response
+        with st.chat_message("assistant"):
+            status = st.empty()
+            failed = False
+
+            def mark_failed():
+                nonlocal failed
+                failed = True
+
+            def answer():
+                if STREAMING_ENABLED:
+                    return st.write_stream(stream_flowise(user_input, api_url, bot_type, override_config_text=extra_data, cache=cacheable, on_error=mark_failed))
+                text = query_flowise(user_input, api_url, bot_type, override_config_text=extra_data, cache=cacheable, on_error=mark_failed).get('text')
+                if text:
+                    st.markdown(text)
+                return text
+
+            try:
+                ai_response = retry_when_busy(answer, lambda attempt, delay: status.markdown(busy_status(attempt, delay)))
+            except Overloaded:
+                ai_response, failed = BUSY_ANSWER, True
+                status.markdown(ai_response)
+            except CircuitOpen as e:
+                ai_response, failed = unavailable_answer(e), True
+                status.markdown(ai_response)
+            else:
+                status.empty()
+                if not ai_response:
+                    ai_response, failed = 'Sorry, I couldn\'t process that.', True
+                    st.markdown(ai_response)
+        st.session_state.conversations.append(title, "assistant", ai_response, error=failed)
+
+
+def submit_user_input(title, user_input, api_url, bot_type, extra_data, cacheable=False, attachment=None):
+    # Hands the turn to the background executor and returns straight away; the
+    # answer is shown by show_pending_turn. Returns False if it was not accepted.
+    try:
+        admission_controller.check_session(st.session_state.session_id)
+    except RateLimited as e:
+        st.warning(f"You're sending messages faster than we can answer. Please try again in {e.retry_after:.0f} seconds.")
+        return False
+    if bot_type == 'resume' and attachment is None:
+        extra_data = resume_followup_context(user_input, extra_data)
+    if not BACKGROUND_TURNS:
+        process_user_input(title, user_input, api_url, bot_type, extra_data, cacheable, attachment)
+        return True
+
+    from chat_executor import ExecutorFull, chat_executor
+
+    if bot_type == 'advice' and 'advice_compaction' in st.session_state:
+        from context_compaction import log_savings
+        log_savings(st.session_state.advice_compaction)
+    try:
+        turn = chat_executor.submit(
+            st.session_state.session_id, title, compose_question(user_input, attachment),
+            run_chat_turn, api_url, bot_type, extra_data, cacheable,
+        )
+    except ExecutorFull:
+        st.warning("We're answering a lot of messages right now. Please wait for the current answer and try again.")
+        return False
+    # Answers are shown in the order the questions were sent. A question sent while
+    # another is still being answered waits with its turn and joins the history
+    # after that answer.
+    pending = st.session_state.setdefault(f"{title}_pending", [])
+    if pending:
+        pending.append((turn.id, user_input, attachment))
+    else:
+        st.session_state.conversations.append(title, "user", user_input, attachment)
+        pending.append((turn.id, None, None))
+    return True
+
+
+def resume_followup_context(question, resume_text):
+    # Follow-up questions only carry the resume chunks relevant to them (see resume_index.py)
+    index = st.session_state.get("resume_index")
+    if index is None or index.text != resume_text:
+        return resume_text
+    return index.context(question)
+
+
+def run_chat_turn(turn, api_url, bot_type, extra_data, cacheable):
+    # Runs on a chat_executor worker thread: no st.* calls in here
+    def answer():
+        if STREAMING_ENABLED:
+            for token in stream_flowise(turn.user_input, api_url, bot_type, override_config_text=extra_data, cache=cacheable, on_error=mark_failed):
+                if turn.cancelled:
+                    break
+                turn.append(token)
+            return turn.partial_text
+        return query_flowise(turn.user_input, api_url, bot_type, override_config_text=extra_data, cache=cacheable, on_error=mark_failed).get('text')
+
+    def mark_failed():
+        turn.failed = True
+
+    def show_busy(attempt, delay):
+        turn.status = busy_status(attempt, delay)
+
+    with instrumentation.trace("chat_turn", api_url):
+        try:
+            text = retry_when_busy(answer, show_busy)
+        except Overloaded:
+            turn.failed = True
+            return BUSY_ANSWER
+        except CircuitOpen as e:
+            turn.failed = True
+            return unavailable_answer(e)
+        if not text:
+            turn.failed = True
+            return 'Sorry, I couldn\'t process that.'
+        return text
+
+
+BUSY_ANSWER = "The counselor is busy right now. Please try again in a minute."
+
+def unavailable_answer(error):
+    # Shown instead of an answer while the chatflow's circuit breaker is open
+    return f"The counselor can't be reached right now. Please try again in about {max(error.retry_after, 1):.0f} seconds."
+
+
+def busy_status(attempt, delay):
+    return f"_The counselor is busy, retrying in {delay:.0f}s (attempt {attempt})..._"
+
+
+def cancel_pending_turn(title):
+    from chat_executor import chat_executor
+
+    for turn_id, _, _ in st.session_state.pop(f"{title}_pending", []):
+        chat_executor.cancel(turn_id)
+
+
+# How often (seconds) a pending answer is refreshed while it is generated
+PENDING_POLL_INTERVAL = float(os.environ.get("CHAT_POLL_INTERVAL", "0.5"))
+
+@st.fragment(run_every=PENDING_POLL_INTERVAL)
+def show_pending_turn(title):
+    from chat_executor import chat_executor
+
+    pending = st.session_state.get(f"{title}_pending")
+    if not pending:
+        st.rerun()
+    turn_id = pending[0][0]
+    turn = chat_executor.get(turn_id)
+    if turn is None or turn.done():
+        pending.pop(0)
+        conversations = st.session_state.conversations
+        if turn is not None:
+            chat_executor.collect(turn_id)
+            failed = turn.failed
+            try:
+                ai_response = turn.result()
+            except Exception:
+                ai_response, failed = "An unexpected error occurred", True
+            conversations.append(title, "assistant", ai_response, error=failed)
+        if pending:
+            # The next question's turn to be shown
+            next_id, user_input, attachment = pending[0]
+            conversations.append(title, "user", user_input, attachment)
+            pending[0] = (next_id, None, None)
+        else:
+            st.session_state.pop(f"{title}_pending", None)
+        st.rerun()
+
+    with st.chat_message("assistant"):
+        st.markdown(turn.partial_text or turn.status or "_Thinking..._")
+    for _, user_input, _ in pending[1:]:
+        with st.chat_message("user"):
+            st.markdown(user_input)
+    if st.button("Cancel", key=f"{title}_cancel"):
+        cancel_pending_turn(title)
+        st.rerun()
+
+
+def rotate_session_id_on_first_write():
+    # The first time this browser session adds anything (an upload or a turn), it
+    # moves to a sid nobody else has seen, even one who shared a link to a stored
+    # session with the student. The old sid is forgotten.
+    conversations = st.session_state.conversations
+    state = (conversations.version, st.session_state.resume_text)
+    initial = st.session_state.setdefault("sid_initial_state", state)
+    if st.session_state.get("sid_rotated") or state == initial:
+        return
+    old_sid = st.session_state.session_id
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.sid_rotated = True
+    st.query_params["sid"] = st.session_state.session_id
+    session_persister.forget(old_sid)
+
+
+def render_rerun_profile():
+    st.subheader("Rerun profile")
+    if rerun_profiler.MODE == "0":
+        st.write("Rerun profiling is off; set RERUN_PROFILE=1 (or =query and open the app with ?profile=1).")
+        return
+    st.write(f"Time per rerun phase across sessions; reruns over {rerun_profiler.SLOW_SECONDS * 1000:.0f}ms have their stacks saved.")
+    st.dataframe(rerun_profiler.phase_summary(), use_container_width=True)
+    for path in rerun_profiler.output_files():
+        st.caption(path)
+
+
+def collect_cache_metrics():
+    gauges = []
+    for name, value in extraction_cache.stats().items():
+        gauges.append((f"resume_extraction_cache_{name}", {}, value))
+    for name, value in response_cache.stats().items():
+        gauges.append((f"flowise_response_cache_{name}", {}, value))
+    return gauges
+
+instrumentation.registry.register_collector("caches", collect_cache_metrics)
+
+# Stream tokens into the chat as Flowise generates them (FLOWISE_STREAMING=0 to disable)
+STREAMING_ENABLED = os.environ.get("FLOWISE_STREAMING", "1") != "0"
+
+# Chat history rendering: messages rendered individually, and older messages
+# revealed per "Show earlier" click (CHAT_RENDER_RECENT=0 renders everything)
+RENDER_RECENT_MESSAGES = int(os.environ.get("CHAT_RENDER_RECENT", "20"))
+RENDER_PAGE_SIZE = int(os.environ.get("CHAT_RENDER_PAGE_SIZE", "50"))
+
+# Run chatbot turns on the background executor (CHAT_BACKGROUND=0 to run them inline)
+BACKGROUND_TURNS = os.environ.get("CHAT_BACKGROUND", "1") != "0"
 
 # Define API URLs
 STRENGTHS_WEAKNESSES_API = "https://finflowise.onrender.com/api/v1/prediction/0113af8b-95c9-438f-b3fd-6db650058e9c"
@@ -212,93 +428,188 @@ ACADEMIC_BACKGROUND_API = "https://finflowise.onrender.com/api/v1/prediction/7f1
 RESUME_API_URL = "https://finflowise.onrender.com/api/v1/prediction/491fa248-427b-417e-ab7d-6aac47ae20ff"
 CAREER_ADVICE_API_URL = "https://finflowise.onrender.com/api/v1/prediction/031ba775-099b-491c-96ef-f0a7e45c72fa"
 
-if selected == "Home":
-    st.title("Welcome to Student Career Counselor")
-    st.markdown("<p class='big-font'>Discover your perfect career path with our AI-powered guidance.</p>", unsafe_allow_html=True)
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        stcard.card(
-            title="Explore Your Strengths",
-            text="Uncover your unique abilities and talents.",
-            image="https://img.icons8.com/color/96/000000/strength.png",
-            url="#"
-        )
-    with col2:
-        stcard.card(
-            title="Analyze Your Experience",
-            text="Get insights from your past work and projects.",
-            image="https://img.icons8.com/color/96/000000/resume.png",
-            url="#"
-        )
-    with col3:
-        stcard.card(
-            title="Plan Your Future",
-            text="Receive personalized career recommendations.",
-            image="https://img.icons8.com/color/96/000000/road.png",
-            url="#"
+# Route names for FLOWISE_ENDPOINTS(_FILE), which can add backends per chatbot
+endpoints.endpoint_registry.set_routes({
+    "strengths_weaknesses": STRENGTHS_WEAKNESSES_API,
+    "academic_background": ACADEMIC_BACKGROUND_API,
+    "resume": RESUME_API_URL,
+    "career_advice": CAREER_ADVICE_API_URL,
+})
+
+PROFILE_SUMMARY_PROMPT = "Summarise what this conversation reveals about me as a student, in a few bullet points:"
+RESUME_SUMMARY_PROMPT = "Summarise the key skills, experience and achievements in my resume, in a few bullet points."
+
+def build_profile_queries():
+    import advice_fanout
+
+    conversations = st.session_state.conversations
+    queries = []
+    for title, api_url in (
+        ("Discover Your Strengths & Weaknesses", STRENGTHS_WEAKNESSES_API),
+        ("Academic Background", ACADEMIC_BACKGROUND_API),
+    ):
+        summary = conversations.summary(title)
+        if summary:
+            question = f"{PROFILE_SUMMARY_PROMPT}\n{summary}"
+            queries.append(advice_fanout.SectionQuery(title, api_url, build_flowise_payload(question)))
+    if st.session_state.resume_text:
+        payload = build_flowise_payload(RESUME_SUMMARY_PROMPT, 'resume', st.session_state.resume_text)
+        queries.append(advice_fanout.SectionQuery("Resume Review", RESUME_API_URL, payload))
+    return queries
+
+def get_full_profile():
+    import advice_fanout
+
+    # Only sections whose inputs changed, or that failed and are due a retry, are asked again
+    cache = st.session_state.setdefault("full_profile", advice_fanout.ProfileCache())
+    queries = build_profile_queries()
+    due = cache.due(queries)
+    if due:
+        results = advice_fanout.fetch_profile(due)
+        for result in results:
+            logging.info(f"Profile summary for {result.section}: ok={result.ok} in {result.elapsed:.2f}s")
+        cache.update(due, results)
+    return cache.profile(queries)
+
+# The selected page; phases inside it are timed separately as well
+with rerun_profiler.phase("page"):
+    if selected == "Home":
+        page_shell.render_home()
+
+    elif selected == "Strengths & Weaknesses":
+        display_chatbot(
+            "Discover Your Strengths & Weaknesses",
+            "Let's explore your unique abilities and areas for growth.",
+            api_url=STRENGTHS_WEAKNESSES_API
         )
 
-elif selected == "Strengths & Weaknesses":
-    display_chatbot(
-        "Discover Your Strengths & Weaknesses",
-        "Let's explore your unique abilities and areas for growth.",
-        api_url=STRENGTHS_WEAKNESSES_API
-    )
-
-elif selected == "Resume Review":
-    st.header("Resume Review & Work Experience Analysis")
-    st.write("Upload your resume and we'll analyze your past experiences to highlight your key skills.")
+    elif selected == "Resume Review":
+        st.header("Resume Review & Work Experience Analysis")
+        st.write("Upload your resume and we'll analyze your past experiences to highlight your key skills.")
+
+        uploaded_file = st.file_uploader("Choose your resume PDF file", type="pdf")
+        if uploaded_file is not None:
+            import pdf_extract
+            import resume_normalize
+
+            def extract_resume(pdf):
+                # Headers, footers, hyphenation and layout whitespace are stripped as pages arrive
+                return resume_normalize.normalize_resume(pdf_extract.iter_page_texts(pdf))
+
+            with rerun_profiler.phase("pdf_extract"):
+                try:
+                    if uploaded_file.size > pdf_extract.MAX_BYTES:
+                        # Checked before the upload is hashed or parsed at all
+                        raise pdf_extract.PDFTooLarge(f"The PDF is over {pdf_extract.MAX_BYTES / 2 ** 20:.0f} MB")
+                    # getvalue() hands back the upload's own bytes (BytesIO is copy-on-write);
+                    # getbuffer() or read() would copy them on every rerun
+                    resume_text = extraction_cache.get_or_extract(uploaded_file.getvalue(), extract_resume)
+                except pdf_extract.PDFTooLarge as e:
+                    logging.warning(f"Resume upload refused: {e}")
+                    st.error(f"{e}. Please upload a shorter resume.")
+                    st.stop()
+                except pdf_extract.ExtractionBudgetExceeded as e:
+                    logging.error(f"Resume extraction failed: {e}")
+                    st.error("We couldn't read this PDF in time. Please upload a shorter or simpler file.")
+                    st.stop()
+            logging.debug(f"Resume extraction cache: {extraction_cache.stats()}")
+            # One copy of the text per session: keep the object the chat history and
+            # persisted session already reference when the re-extracted text is the same
+            if st.session_state.resume_text != resume_text:
+                st.session_state.resume_text = resume_text
+            resume_text = st.session_state.resume_text
+            import resume_index
+            if resume_index.ENABLED:
+                index = st.session_state.get("resume_index")
+                if index is None or index.text != resume_text:
+                    with rerun_profiler.phase("resume_index"):
+                        st.session_state.resume_index = resume_index.ResumeIndex(resume_text)
+            st.success("Resume uploaded successfully!")
+            #st.write(resume_text)
+
+            # Pass the resume_text as the initial message to the bot
+            display_chatbot(
+                "Resume Analysis",
+                "Ask questions about your resume or request an analysis.",
+                api_url=RESUME_API_URL,
+                bot_type='resume',
+                extra_data=resume_text,
+                # Send the resume as the first message automatically
+                initial_message='My Resume:',
+                initial_attachment=resume_text
+            )
+        else:
+            st.info("Please upload your resume to start the analysis.")
 
-    uploaded_file = st.file_uploader("Choose your resume PDF file", type="pdf")
-    if uploaded_file is not None:
-        reader = PdfReader(uploaded_file)
-        resume_text = ''.join(page.extract_text() for page in reader.pages)
-        st.success("Resume uploaded successfully!")
-        #st.write(resume_text)
 
-        # Pass the resume_text as the initial message to the bot
+    elif selected == "Academic Background":
         display_chatbot(
-            "Resume Analysis",
-            "Ask questions about your resume or request an analysis.",
-            api_url=RESUME_API_URL,
-            bot_type='resume',
-            extra_data=resume_text,
-            initial_message=f'My Resume:\n\n{resume_text}'  # Send the resume as the first message automatically
+            "Academic Background",
+            "Let's discuss your educational journey and academic interests.",
+            api_url=ACADEMIC_BACKGROUND_API
         )
-    else:
-        st.info("Please upload your resume to start the analysis.")
-
-
-elif selected == "Academic Background":
-    display_chatbot(
-        "Academic Background",
-        "Let's discuss your educational journey and academic interests.",
-        api_url=ACADEMIC_BACKGROUND_API
-    )
 
-elif selected == "Career Advice":
-    st.header("Personalized Career Recommendations")
-    st.write("Based on your previous conversations, we'll provide personalized career advice.")
+    elif selected == "Career Advice":
+        st.header("Personalized Career Recommendations")
+        st.write("Based on your previous conversations, we'll provide personalized career advice.")
 
-    # Combine all previous conversation results
-    all_conversations = "\n\n".join([f"{key}:\n{value}" for key, value in st.session_state.conversation_results.items() if value])
-    
-
-    if all_conversations:
-        st.write(all_conversations)
-        display_chatbot(
-            "Career Advice",
-            "Ask for career advice based on your profile.",
-            api_url=CAREER_ADVICE_API_URL,
-            bot_type='advice',
-            extra_data=all_conversations,
-            initial_message=f'Here is my conversation with the other Chatbots:\n\n{all_conversations}'
+        full_profile = st.toggle(
+            "Full profile mode",
+            help="Ask the Strengths & Weaknesses, Academic Background and Resume assistants for a summary (in parallel) and base the advice on those.",
         )
+        with rerun_profiler.phase("profile"):
+            sections = st.session_state.conversations.summaries()
+            if full_profile:
+                with st.spinner("Summarising your profile..."):
+                    sections = get_full_profile() or sections
+
+            # Combine all previous conversation results, compacted to the token budget
+            from context_compaction import profile_compactor
+            all_conversations, compaction_stats = profile_compactor.compact(sections)
+            st.session_state.advice_compaction = compaction_stats
+
+        if all_conversations:
+            st.write(all_conversations)
+            display_chatbot(
+                "Career Advice",
+                "Ask for career advice based on your profile.",
+                api_url=CAREER_ADVICE_API_URL,
+                bot_type='advice',
+                extra_data=all_conversations,
+                # The conversations already travel in overrideConfig.profile; don't send them twice
+                initial_message='Here is my conversation with the other Chatbots. It is included in my profile; please give me career advice based on it.'
+            )
         
-    else:
-        st.warning("Please complete the other sections before seeking career advice.")
+        else:
+            st.warning("Please complete the other sections before seeking career advice.")
+
+    elif selected == "Metrics":
+        st.header("Flowise Metrics")
+        st.write("Latency of Flowise calls in this process since it started.")
+        st.dataframe(instrumentation.latency_summary(), use_container_width=True)
+        render_rerun_profile()
+        st.code(instrumentation.render_prometheus(), language="text")
 
 # Add a footer
 st.markdown("---")
 st.markdown("© 2024 AI Career Counselor. All rights reserved.")
+
+# Queue the session for the write-behind store (a no-op if nothing changed)
+if session_persister is not None:
+    with rerun_profiler.phase("persist"):
+        rotate_session_id_on_first_write()
+        session_persister.schedule(
+            st.session_state.session_id, st.session_state.conversations, st.session_state.resume_text
+        )
+
+# ?profile=1 shows where this rerun's time went (when RERUN_PROFILE allows it)
+rerun = rerun_profiler.current()
+if PROFILE_PANEL and rerun is not None:
+    with st.expander("Rerun profile"):
+        st.write(f"This rerun so far: {(time.perf_counter() - rerun.start) * 1000:.0f}ms")
+        st.dataframe(
+            [{"phase": name, "ms": round(seconds * 1000, 1)} for name, seconds in rerun.phases],
+            use_container_width=True,
+        )
+        render_rerun_profile()
+rerun_profiler.end()
@@ -0,0 +1,90 @@
+"""The static parts of the app: its stylesheet and the Home page.
+
+Neither depends on the session, so both are built once per process with
+st.cache_resource and every rerun only re-sends the cached markup.
+
+The Home cards are plain HTML rather than streamlit_card components, which
+cost an iframe and a JavaScript bundle each. Their icons are vendored in
+static/ and served by Streamlit itself (server.enableStaticServing in
+.streamlit/config.toml), so the page makes no third-party requests. Icon
+URLs carry a ``v`` argument with a hash of the file: Tornado serves those
+with a ten-year Cache-Control, and the URL changes when the icon does.
+"""
+import hashlib
+import os
+
+import streamlit as st
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+HOME_CARDS = (
+    ("Explore Your Strengths", "Uncover your unique abilities and talents.", "strength.png"),
+    ("Analyze Your Experience", "Get insights from your past work and projects.", "resume.png"),
+    ("Plan Your Future", "Receive personalized career recommendations.", "road.png"),
+)
+
+STYLESHEET = """
+.stApp { background-color: #175676; }
+.big-font { font-size: 24px !important; }
+.stButton>button {
+    background-color: #4169E1;
+    color: white;
+    border-radius: 10px;
+    padding: 10px 20px;
+    font-size: 18px;
+}
+.stTextInput>div>div>input { border-radius: 10px; }
+.css-1d391kg { padding: 2rem 1rem; }
+"""
+
+# Only sent with the Home page
+HOME_STYLESHEET = """
+.home-cards { display: flex; flex-wrap: wrap; gap: 1.5rem; }
+.home-card {
+    flex: 1 1 14rem;
+    background: white;
+    border-radius: 10px;
+    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.25);
+    padding: 1.5rem;
+    text-align: center;
+}
+.home-card img { width: 96px; height: 96px; }
+.home-card h3 { color: #175676; padding: 0.75rem 0 0.25rem; }
+.home-card p { color: #31333F; margin: 0; }
+"""
+
+
+def static_url(name):
+    """URL of a file in static/, versioned by its content."""
+    with open(os.path.join(STATIC_DIR, name), "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"app/static/{name}?v={version}"
+
+
+def _minify(css):
+    return "<style>" + " ".join(css.split()) + "</style>"
+
+
+@st.cache_resource
+def stylesheet():
+    # Sent on every rerun of every page, so without the indentation
+    return _minify(STYLESHEET)
+
+
+@st.cache_resource
+def home_cards():
+    cards = "".join(
+        f'<div class="home-card"><img src="{static_url(icon)}" alt=""><h3>{title}</h3><p>{text}</p></div>'
+        for title, text, icon in HOME_CARDS
+    )
+    return _minify(HOME_STYLESHEET) + f'<div class="home-cards">{cards}</div>'
+
+
+def render_stylesheet():
+    st.markdown(stylesheet(), unsafe_allow_html=True)
+
+
+def render_home():
+    st.title("Welcome to Student Career Counselor")
+    st.markdown("<p class='big-font'>Discover your perfect career path with our AI-powered guidance.</p>", unsafe_allow_html=True)
+    st.markdown(home_cards(), unsafe_allow_html=True)
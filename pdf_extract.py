@@ -0,0 +1,297 @@
+"""Parallel, budgeted text extraction for uploaded PDFs.
+
+Large uploads (CVs with transcripts and portfolios attached) are split page
+by page across worker processes and the page texts are yielded in page order
+as they complete. Every extraction runs under budgets so a pathological PDF
+cannot pin a core:
+
+* a per-page time limit, enforced with SIGALRM; a page that runs over is
+  skipped,
+* a total time limit, enforced by the caller; when it runs out the
+  extraction's workers are terminated (killing any stuck one) and
+  ExtractionBudgetExceeded is raised,
+* per-page and total character limits; text beyond them is dropped.
+
+SIGALRM can only interrupt the main thread, and Streamlit runs scripts in
+other threads, so there every document with a page limit goes to worker
+processes; short ones to a single worker. Each extraction starts its own
+workers (forked from a forkserver that has pypdf loaded) and stops them when
+it ends, so one session's stuck PDF never takes down another's extraction.
+At most PDF_EXTRACT_MAX_POOLS extractions run in workers at once; the rest
+wait, within their total time limit. Short documents read on the main thread
+(benchmarks, batch_resumes' workers) are extracted in-process, where workers
+would cost more than they save, under the same page limit.
+
+Uploads over PDF_MAX_BYTES or PDF_MAX_PAGES are refused with PDFTooLarge
+before any page is parsed. Documents of at least PDF_SPOOL_BYTES are
+spooled to a temporary file and read by pypdf through a read-only mmap, so
+the parser does not hold a private copy of the upload; the workers read the
+same file.
+"""
+import atexit
+import contextlib
+import io
+import logging
+import mmap
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+
+from pypdf import PdfReader
+
+PAGE_TIMEOUT = float(os.environ.get("PDF_PAGE_TIMEOUT", "5"))
+TOTAL_TIMEOUT = float(os.environ.get("PDF_TOTAL_TIMEOUT", "30"))
+MAX_PAGE_CHARS = int(os.environ.get("PDF_MAX_PAGE_CHARS", "50000"))
+MAX_TOTAL_CHARS = int(os.environ.get("PDF_MAX_TOTAL_CHARS", "400000"))
+MAX_BYTES = int(os.environ.get("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "50"))
+SPOOL_BYTES = int(os.environ.get("PDF_SPOOL_BYTES", str(1024 * 1024)))
+# Documents with fewer pages than this get one worker, or none on the main thread
+PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "8"))
+WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_POOLS = int(os.environ.get("PDF_EXTRACT_MAX_POOLS", "4"))
+
+
+class ExtractionBudgetExceeded(Exception):
+    """The PDF could not be extracted within the configured time budget."""
+
+
+class PDFTooLarge(Exception):
+    """The PDF is over the upload size or page count limit."""
+
+
+class _PageTimeout(Exception):
+    pass
+
+
+# --- worker side -----------------------------------------------------------
+
+_worker_readers = {}
+
+
+def _on_alarm(signum, frame):
+    raise _PageTimeout()
+
+
+def _reader_for(path):
+    reader = _worker_readers.get(path)
+    if reader is None:
+        # Workers only ever serve a handful of documents at a time
+        if len(_worker_readers) >= 4:
+            _worker_readers.clear()
+        reader = _worker_readers[path] = PdfReader(path)
+    return reader
+
+
+def _alarm_available():
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+def _timed_extract(page, page_timeout):
+    """(text, timed_out) for ``page``, interrupted after ``page_timeout`` seconds."""
+    timed = bool(page_timeout) and _alarm_available()
+    if timed:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, page_timeout)
+    try:
+        return page.extract_text() or "", False
+    except _PageTimeout:
+        return "", True
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_page(task):
+    path, index, page_timeout, max_page_chars = task
+    text, timed_out = _timed_extract(_reader_for(path).pages[index], page_timeout)
+    if timed_out:
+        # The interrupted parse may have left the reader half-way through an object
+        _worker_readers.pop(path, None)
+    return index, text[:max_page_chars], timed_out
+
+
+# --- pool management -------------------------------------------------------
+
+# Pools of the extractions in progress, terminated at exit
+_pools = set()
+_pools_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(MAX_POOLS)
+
+
+def _start_method():
+    # Forking a multi-threaded Streamlit server is unsafe; prefer forkserver
+    configured = os.environ.get("PDF_EXTRACT_START_METHOD")
+    if configured:
+        return configured
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+def _context():
+    context = multiprocessing.get_context(_start_method())
+    if context.get_start_method() == "forkserver":
+        # Workers fork from a server that has already imported pypdf
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+@contextlib.contextmanager
+def _extraction_pool(processes, deadline):
+    """A pool for one extraction; terminated unless it finished cleanly."""
+    if not _pool_slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+        raise ExtractionBudgetExceeded("PDF extraction ran out of time waiting for a worker")
+    try:
+        pool = _context().Pool(processes=processes)
+        with _pools_lock:
+            _pools.add(pool)
+        finished = False
+        try:
+            yield pool
+            finished = True
+        finally:
+            with _pools_lock:
+                _pools.discard(pool)
+            if finished:
+                pool.close()
+            else:
+                # Timed out or abandoned: a worker may still be stuck in a page
+                pool.terminate()
+            pool.join()
+    finally:
+        _pool_slots.release()
+
+
+def shutdown():
+    with _pools_lock:
+        pools = list(_pools)
+        _pools.clear()
+    for pool in pools:
+        pool.terminate()
+        pool.join()
+
+
+atexit.register(shutdown)
+
+
+# --- public API ------------------------------------------------------------
+
+def _iter_serial(reader, deadline, page_timeout, max_page_chars):
+    for index, page in enumerate(reader.pages):
+        if time.monotonic() > deadline:
+            raise ExtractionBudgetExceeded(f"PDF extraction ran out of time at page {index + 1}")
+        text, timed_out = _timed_extract(page, page_timeout)
+        if timed_out:
+            logging.warning(f"Skipped PDF page {index + 1}: extraction took longer than {page_timeout}s")
+        yield text[:max_page_chars]
+
+
+def _iter_parallel(path, page_count, processes, deadline, page_timeout, max_page_chars):
+    tasks = [(path, index, page_timeout, max_page_chars) for index in range(page_count)]
+    with _extraction_pool(processes, deadline) as pool:
+        results = pool.imap(_extract_page, tasks)
+        for _ in range(page_count):
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise multiprocessing.TimeoutError()
+                index, text, timed_out = results.next(timeout=remaining)
+            except multiprocessing.TimeoutError:
+                raise ExtractionBudgetExceeded("PDF extraction ran out of time") from None
+            if timed_out:
+                logging.warning(f"Skipped PDF page {index + 1}: extraction took longer than {page_timeout}s")
+            yield text
+
+
+@contextlib.contextmanager
+def _mapped(path):
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+@contextlib.contextmanager
+def open_pdf(pdf, spool_bytes=SPOOL_BYTES, max_bytes=MAX_BYTES):
+    """(stream, path) to read ``pdf`` from: a path, or bytes-like.
+
+    Small documents are read from memory (path is None); larger ones are
+    spooled to a temporary file and mapped, and removed on exit.
+    """
+    size = os.path.getsize(pdf) if isinstance(pdf, str) else len(pdf)
+    if size > max_bytes:
+        raise PDFTooLarge(f"The PDF is {size / 2 ** 20:.1f} MB; the limit is {max_bytes / 2 ** 20:.0f} MB")
+    if isinstance(pdf, str):
+        with _mapped(pdf) as stream:
+            yield stream, pdf
+        return
+    if size < spool_bytes:
+        yield io.BytesIO(pdf), None
+        return
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        # Writing the buffer directly: no intermediate bytes copy of the upload
+        f.write(memoryview(pdf))
+        path = f.name
+    try:
+        with _mapped(path) as stream:
+            yield stream, path
+    finally:
+        os.unlink(path)
+
+
+def iter_page_texts(
+    pdf,
+    page_timeout=PAGE_TIMEOUT,
+    total_timeout=TOTAL_TIMEOUT,
+    max_page_chars=MAX_PAGE_CHARS,
+    max_total_chars=MAX_TOTAL_CHARS,
+    parallel_min_pages=PARALLEL_MIN_PAGES,
+    max_pages=MAX_PAGES,
+):
+    """Yield the text of each page of ``pdf`` (bytes-like or a path) in page order.
+
+    Raises PDFTooLarge before the first page if the document is over the
+    size or page limits.
+    """
+    deadline = time.monotonic() + total_timeout
+    with open_pdf(pdf) as (stream, path):
+        reader = PdfReader(stream)
+        page_count = len(reader.pages)
+        if page_count > max_pages:
+            raise PDFTooLarge(f"The PDF has {page_count} pages; the limit is {max_pages}")
+        pool_copy = None
+        short = page_count < parallel_min_pages or WORKERS < 2
+        if short and (not page_timeout or _alarm_available()):
+            pages = _iter_serial(reader, deadline, page_timeout, max_page_chars)
+        else:
+            if path is None:
+                # Under the spool size, but the workers read from a file
+                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                    f.write(memoryview(pdf))
+                    path = pool_copy = f.name
+            processes = 1 if short else min(WORKERS, page_count)
+            pages = _iter_parallel(path, page_count, processes, deadline, page_timeout, max_page_chars)
+
+        budget = max_total_chars
+        try:
+            for text in pages:
+                if len(text) >= budget:
+                    logging.warning(f"PDF text truncated at {max_total_chars} characters")
+                    yield text[:budget]
+                    return
+                budget -= len(text)
+                yield text
+        finally:
+            pages.close()
+            # The map closes when open_pdf exits; nothing may still read from it
+            del pages, reader
+            if pool_copy is not None:
+                os.unlink(pool_copy)
+
+
+def extract_text(pdf, **budgets):
+    """Return the text of the whole PDF, pages joined without a separator."""
+    return ''.join(iter_page_texts(pdf, **budgets))
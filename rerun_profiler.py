@@ -0,0 +1,284 @@
+"""Opt-in timing of Streamlit reruns, phase by phase.
+
+Streamlit runs main.py top to bottom on every interaction. With profiling
+on, ``begin()`` starts a Rerun at the top of the script and main.py wraps
+its named parts (stylesheet, sidebar, page, chat history, PDF extraction,
+the Flowise call, ...) in ``phase(name)``. The rerun ends at ``end()``, or
+when st.stop() / st.rerun() leaves a phase early. Phase and rerun durations
+go to the instrumentation histograms (streamlit_rerun_phase_seconds,
+streamlit_rerun_seconds), so they are aggregated across sessions and show up
+on the Metrics page and the Prometheus endpoint.
+
+RERUN_PROFILE selects which reruns are profiled: 0 (none, the default), 1
+(all), or ``query`` (only sessions opened with ``?profile=1``).
+
+Reruns slower than RERUN_PROFILE_SLOW_MS also have their call stacks kept,
+depending on RERUN_PROFILE_CAPTURE:
+
+* ``sample`` (default): one thread samples the stacks of the script threads
+  being profiled every RERUN_PROFILE_SAMPLE_MS. Slow reruns' samples are
+  added to ``reruns.folded`` in RERUN_PROFILE_DIR, in the collapsed-stack
+  format flamegraph.pl, inferno and speedscope read, rooted at the page.
+* ``cprofile``: every profiled rerun runs under cProfile; slow ones are
+  added to ``reruns.pstats`` (for snakeviz, flameprof or ``python -m pstats``).
+  Deterministic, but it makes the rerun itself a good deal slower.
+* ``none``: phase timings only.
+
+Both files accumulate over the life of the process and are rewritten after
+each slow rerun.
+"""
+import collections
+import contextlib
+import contextvars
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import instrumentation
+
+MODE = os.environ.get("RERUN_PROFILE", "0")
+CAPTURE = os.environ.get("RERUN_PROFILE_CAPTURE", "sample")
+SLOW_SECONDS = float(os.environ.get("RERUN_PROFILE_SLOW_MS", "500")) / 1000
+SAMPLE_INTERVAL = float(os.environ.get("RERUN_PROFILE_SAMPLE_MS", "5")) / 1000
+PROFILE_DIR = os.environ.get("RERUN_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "studentcareer-rerun-profiles")
+
+# Most phases take milliseconds; the Flowise latency buckets start at 5ms
+RERUN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+FOLDED_FILE = "reruns.folded"
+PSTATS_FILE = "reruns.pstats"
+
+
+def enabled(query_flag=False):
+    """Whether this rerun is profiled; ``query_flag`` is ``?profile=1``."""
+    return MODE == "1" or (MODE == "query" and query_flag)
+
+
+class Rerun:
+    __slots__ = ("page", "start", "phases", "depth", "thread_id", "samples", "profiler", "finished")
+
+    def __init__(self):
+        self.page = ""
+        self.start = time.perf_counter()
+        # [(phase, seconds)] in the order the phases ended
+        self.phases = []
+        self.depth = 0
+        self.thread_id = threading.get_ident()
+        self.samples = collections.Counter()
+        self.profiler = None
+        self.finished = False
+
+
+_current = contextvars.ContextVar("streamlit_rerun", default=None)
+
+# Aggregated stacks of slow reruns, across sessions
+_folded = collections.Counter()
+_pstats = None
+_output_lock = threading.Lock()
+
+
+class _Sampler(threading.Thread):
+    """Samples the stacks of the script threads with a rerun in progress."""
+
+    def __init__(self, interval):
+        super().__init__(name="rerun-profiler", daemon=True)
+        self.interval = interval
+        self.reruns = {}
+        self.lock = threading.Lock()
+        self._labels = {}
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+        return label
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            # Held while sampling, so a rerun's samples are final once it is removed
+            with self.lock:
+                if self.reruns:
+                    self._sample()
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for rerun in self.reruns.values():
+            frame = frames.get(rerun.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                rerun.samples[";".join(reversed(stack))] += 1
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler():
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = _Sampler(SAMPLE_INTERVAL)
+            _sampler.start()
+        return _sampler
+
+
+def begin(query_flag=False):
+    """Start timing this rerun if profiling applies to it; returns the Rerun or None."""
+    previous = _current.get()
+    if previous is not None and not previous.finished:
+        # Left without reaching end() or a phase (e.g. an exception at top level)
+        _finish(previous, "abandoned")
+    if not enabled(query_flag):
+        _current.set(None)
+        return None
+    rerun = Rerun()
+    _current.set(rerun)
+    if CAPTURE == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            rerun.profiler = profiler
+        except ValueError as e:
+            # Python 3.12+ allows one profiler at a time; another session's rerun has it
+            logging.debug(f"Rerun not profiled: {e}")
+    elif CAPTURE == "sample":
+        sampler = _get_sampler()
+        with sampler.lock:
+            sampler.reruns[rerun.thread_id] = rerun
+    return rerun
+
+
+def current():
+    rerun = _current.get()
+    return rerun if rerun is not None and not rerun.finished else None
+
+
+def set_page(page):
+    rerun = current()
+    if rerun is not None:
+        rerun.page = page
+
+
+@contextlib.contextmanager
+def phase(name):
+    rerun = current()
+    if rerun is None:
+        yield
+        return
+    start = time.perf_counter()
+    rerun.depth += 1
+    try:
+        yield
+    except BaseException as e:
+        # st.stop() and st.rerun() raise through here; the outermost phase ends the rerun
+        rerun.depth -= 1
+        if not rerun.finished:
+            rerun.phases.append((name, time.perf_counter() - start))
+            if not rerun.depth:
+                _finish(rerun, type(e).__name__)
+        raise
+    rerun.depth -= 1
+    rerun.phases.append((name, time.perf_counter() - start))
+
+
+def end():
+    rerun = current()
+    if rerun is not None:
+        _finish(rerun, "")
+
+
+def _finish(rerun, outcome):
+    rerun.finished = True
+    total = time.perf_counter() - rerun.start
+    if rerun.profiler is not None:
+        rerun.profiler.disable()
+    if _sampler is not None:
+        with _sampler.lock:
+            if _sampler.reruns.get(rerun.thread_id) is rerun:
+                del _sampler.reruns[rerun.thread_id]
+
+    registry = instrumentation.registry
+    registry.observe("streamlit_rerun_seconds", {"page": rerun.page, "outcome": outcome}, total, RERUN_BUCKETS)
+    for name, seconds in rerun.phases:
+        registry.observe("streamlit_rerun_phase_seconds", {"phase": name}, seconds, RERUN_BUCKETS)
+    if total < SLOW_SECONDS:
+        return
+    registry.inc("streamlit_slow_reruns_total", {"page": rerun.page})
+    breakdown = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in rerun.phases)
+    logging.info(f"Slow rerun of {rerun.page or 'the app'} took {total * 1000:.0f}ms: {breakdown}")
+    try:
+        _save_stacks(rerun)
+    except OSError as e:
+        logging.warning(f"Could not write rerun profile to {PROFILE_DIR}: {e}")
+
+
+def _replace(name, write):
+    # Written beside the target and renamed, so readers never see half a file
+    path = os.path.join(PROFILE_DIR, name)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _save_stacks(rerun):
+    global _pstats
+    if not (rerun.samples or rerun.profiler):
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    root = f"page:{rerun.page or '?'}"
+    with _output_lock:
+        if rerun.samples:
+            for stack, count in rerun.samples.items():
+                _folded[f"{root};{stack}"] += count
+
+            def write_folded(tmp):
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(f"{stack} {count}\n" for stack, count in _folded.items())
+
+            _replace(FOLDED_FILE, write_folded)
+        if rerun.profiler is not None:
+            import pstats
+
+            if _pstats is None:
+                _pstats = pstats.Stats(rerun.profiler)
+            else:
+                _pstats.add(rerun.profiler)
+            _replace(PSTATS_FILE, _pstats.dump_stats)
+
+
+def phase_summary():
+    """Rows of p50/p95 time per rerun phase and per page, for display."""
+    rows = []
+    for (name, labels), histogram in sorted(instrumentation.registry.histograms().items()):
+        label_map = dict(labels)
+        if name == "streamlit_rerun_phase_seconds":
+            what = label_map["phase"]
+        elif name == "streamlit_rerun_seconds":
+            what = f"rerun: {label_map['page'] or '?'}" + (f" ({label_map['outcome']})" if label_map["outcome"] else "")
+        else:
+            continue
+        rows.append({
+            "phase": what,
+            "count": histogram.count,
+            "mean_ms": round(histogram.sum / histogram.count * 1000, 1),
+            "p50_ms": histogram.quantile(0.5) * 1000,
+            "p95_ms": histogram.quantile(0.95) * 1000,
+        })
+    return rows
+
+
+def output_files():
+    """Paths of the stack files written so far."""
+    return [
+        path for path in (os.path.join(PROFILE_DIR, name) for name in (FOLDED_FILE, PSTATS_FILE))
+        if os.path.exists(path)
+    ]
@@ -0,0 +1,187 @@
+"""Response cache for deterministic Flowise prompts.
+
+Some requests are fully determined by their inputs, e.g. the automatic
+"My Resume: ..." message that opens the Resume Analysis chat. Those are
+fired again whenever a chat is cleared or another session uploads the same
+resume. The cache stores the answer keyed on (api_url, question,
+overrideConfig), with a TTL and LRU eviction.
+
+Two backends are available:
+
+* ``memory``: a per-process OrderedDict (the default),
+* ``sqlite``: a SQLite file shared by every Streamlit worker process on the
+  host (FLOWISE_CACHE_PATH).
+
+Caching is opt-in per bot type (FLOWISE_CACHE_BOT_TYPES), and callers only
+ask for it on deterministic prompts: free-form chat turns are never cached.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(api_url, payload):
+    material = json.dumps(
+        [api_url, payload.get("question"), payload.get("overrideConfig")],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def make_body_key(api_url, body):
+    """Key for an already serialized request body (flowise_client.PreparedPayload.body)."""
+    return hashlib.sha256(api_url.encode() + b"\0" + body).hexdigest()
+
+
+def thread_connection(local, path):
+    """The calling thread's connection to the SQLite file ``path``, kept on
+    ``local`` (a threading.local), in WAL mode so readers never block the writer."""
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        local.conn = conn
+    return conn
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=256, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    # Evicting needs a COUNT(*), so only do it every few writes
+    EVICT_EVERY = 32
+
+    def __init__(self, path, max_entries=5000, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def _connect(self):
+        return thread_connection(self._local, self.path)
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache read failed: {e}")
+            return None
+
+    def set(self, key, value):
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, now + self.ttl, now),
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache write failed: {e}")
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+class ResponseCache:
+    def __init__(self, backend, bot_types=()):
+        self.backend = backend
+        self.bot_types = frozenset(bot_types)
+        self.hits = 0
+        self.misses = 0
+
+    def enabled_for(self, bot_type):
+        return bot_type in self.bot_types
+
+    def get(self, api_url, payload, key=None):
+        value = self.backend.get(key or make_key(api_url, payload))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, api_url, payload, result, key=None):
+        self.backend.set(key or make_key(api_url, payload), json.dumps(result))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _from_env():
+    ttl = float(os.environ.get("FLOWISE_CACHE_TTL", "86400"))
+    max_entries = int(os.environ.get("FLOWISE_CACHE_MAX_ENTRIES", "256"))
+    bot_types = [t.strip() for t in os.environ.get("FLOWISE_CACHE_BOT_TYPES", "resume").split(",") if t.strip()]
+    if os.environ.get("FLOWISE_CACHE_BACKEND", "memory") == "sqlite":
+        path = os.environ.get("FLOWISE_CACHE_PATH", "flowise_cache.sqlite3")
+        backend = SQLiteBackend(path, max_entries=max_entries, ttl=ttl)
+    else:
+        backend = MemoryBackend(max_entries=max_entries, ttl=ttl)
+    return ResponseCache(backend, bot_types)
+
+
+response_cache = _from_env()
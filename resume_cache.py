@@ -0,0 +1,128 @@
+"""Content-addressed cache for text extracted from uploaded resume PDFs.
+
+Streamlit re-runs main.py on every click, and the uploaded file is still
+there each time, so without a cache the PDF gets parsed again on every rerun.
+Entries are keyed by the SHA-256 of the uploaded bytes and kept in a bounded
+in-memory LRU, optionally backed by a directory on disk (RESUME_CACHE_DIR)
+so that restarted processes do not parse the same PDF again either.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+class ExtractionCache:
+    # Part of the key: bump it whenever extraction output changes, so disk
+    # entries written by older code are not served
+    VERSION = 3
+
+    def __init__(self, max_entries=128, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def key_for(cls, data):
+        # Hashed in place: ``data`` may be an upload's buffer, too big to copy on every rerun
+        digest = hashlib.sha256(f"v{cls.VERSION}:".encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning(f"Could not read resume cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key, text):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write resume cache entry {key}: {e}")
+
+    def _remember(self, key, text):
+        # Caller holds self._lock
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_extract(self, data, extract):
+        """Return the text for ``data``, calling ``extract(data)`` only on a miss.
+
+        Concurrent callers asking for the same PDF wait for the first one
+        rather than parsing it in parallel.
+        """
+        key = self.key_for(data)
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = self._in_flight[key] = threading.Event()
+                    break
+            pending.wait()
+
+        try:
+            text = self._read_disk(key)
+            if text is not None:
+                with self._lock:
+                    self.disk_hits += 1
+            else:
+                text = extract(data)
+                with self._lock:
+                    self.misses += 1
+                self._write_disk(key, text)
+            with self._lock:
+                self._remember(key, text)
+            return text
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            pending.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+extraction_cache = ExtractionCache(
+    max_entries=int(os.environ.get("RESUME_CACHE_MAX_ENTRIES", "128")),
+    cache_dir=os.environ.get("RESUME_CACHE_DIR") or None,
+)
@@ -0,0 +1,157 @@
+"""In-process retrieval over a resume, for follow-up questions.
+
+The first Resume Review turn sends the whole resume; after that the chatflow
+only needs the parts relevant to the question. ``ResumeIndex`` splits the
+normalized text into chunks of about RESUME_INDEX_CHUNK_CHARS along resume
+sections (resume_normalize.iter_section_spans), kept as offsets into the
+text rather than copies of it, and scores them against a
+question with BM25 over hashed terms: no vocabulary is kept, a term is its
+CRC32 modulo 2**20.
+
+The index is a sorted postings list in three NumPy arrays (term, chunk,
+precomputed BM25 weight), so a query is a searchsorted per term and one
+bincount. ``context`` returns the RESUME_INDEX_TOP_K best chunks in document
+order, or the whole resume when it has no more chunks than that.
+RESUME_INDEX=0 sends the whole resume with every question, as before.
+"""
+import logging
+import os
+import re
+import sys
+import zlib
+
+import numpy as np
+
+import instrumentation
+from resume_normalize import iter_section_spans
+
+ENABLED = os.environ.get("RESUME_INDEX", "1") != "0"
+TOP_K = int(os.environ.get("RESUME_INDEX_TOP_K", "4"))
+CHUNK_CHARS = int(os.environ.get("RESUME_INDEX_CHUNK_CHARS", "600"))
+
+HASH_BITS = 20
+# BM25 term-frequency saturation and length normalization
+K1 = 1.5
+B = 0.75
+
+_WORD_RE = re.compile(r"\w[\w+#]*")
+_NONBLANK_RE = re.compile(r"\S")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from have how i in is it me my "
+    "of on or our should that the this to was what when where which who why "
+    "will with you your".split()
+)
+
+
+def term_ids(text):
+    """Hashed ids of the words in ``text``, stopwords dropped."""
+    mask = (1 << HASH_BITS) - 1
+    return np.fromiter(
+        (zlib.crc32(word.encode()) & mask for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS),
+        dtype=np.int64,
+    )
+
+
+def chunk_spans(text, max_chars=CHUNK_CHARS):
+    """[(section, start, end)]: chunks of ``text`` of at most ``max_chars``,
+    split along section and then line boundaries."""
+    spans = []
+
+    def add(name, start, end):
+        if _NONBLANK_RE.search(text, start, end):
+            spans.append((name, start, end))
+
+    for name, start, end in iter_section_spans(text):
+        chunk_start = pos = start
+        while pos < end:
+            line_end = text.find("\n", pos, end)
+            line_end = end if line_end == -1 else line_end
+            if line_end - chunk_start > max_chars and pos > chunk_start:
+                add(name, chunk_start, pos)
+                chunk_start = pos
+            if line_end - chunk_start > max_chars:
+                # A single line longer than a chunk: break it at a space
+                cut = text.rfind(" ", chunk_start + 1, chunk_start + max_chars)
+                cut = chunk_start + max_chars if cut == -1 else cut
+                add(name, chunk_start, cut)
+                chunk_start = pos = cut
+                continue
+            pos = line_end + 1
+        add(name, chunk_start, end)
+    return spans
+
+
+class ResumeIndex:
+    # Chunks are kept as offsets into ``text``, the session's only copy of the resume
+    __slots__ = ("text", "_spans", "_terms", "_chunk_of", "_weights")
+
+    def __init__(self, text, max_chars=CHUNK_CHARS):
+        self.text = text
+        self._spans = chunk_spans(text, max_chars)
+        n = len(self._spans)
+        ids, counts, chunk_of, lengths = [], [], [], np.zeros(n)
+        for i in range(n):
+            terms = term_ids(self.chunk(i))
+            unique, tf = np.unique(terms, return_counts=True)
+            ids.append(unique)
+            counts.append(tf)
+            chunk_of.append(np.full(len(unique), i, dtype=np.int32))
+            lengths[i] = len(terms)
+        if not n:
+            self._terms = np.zeros(0, dtype=np.int64)
+            self._chunk_of = np.zeros(0, dtype=np.int32)
+            self._weights = np.zeros(0)
+            return
+        terms = np.concatenate(ids)
+        tf = np.concatenate(counts).astype(float)
+        chunk_of = np.concatenate(chunk_of)
+        order = np.argsort(terms, kind="stable")
+        terms, tf, chunk_of = terms[order], tf[order], chunk_of[order]
+        # Each (term, chunk) pair appears once, so a term's run length is its document frequency
+        _, df = np.unique(terms, return_counts=True)
+        idf = np.repeat(np.log(1 + (n - df + 0.5) / (df + 0.5)), df)
+        norm = K1 * (1 - B + B * lengths[chunk_of] / max(lengths.mean(), 1))
+        self._terms = terms
+        self._chunk_of = chunk_of
+        self._weights = idf * tf * (K1 + 1) / (tf + norm)
+
+    def __len__(self):
+        return len(self._spans)
+
+    def chunk(self, i):
+        """Chunk ``i``, labelled with its section (e.g. "EXPERIENCE:")."""
+        name, start, end = self._spans[i]
+        return f"{name.upper()}:\n{self.text[start:end].strip()}"
+
+    def scores(self, question):
+        """BM25 score of every chunk for ``question``."""
+        query = np.unique(term_ids(question))
+        lo = np.searchsorted(self._terms, query, "left")
+        hi = np.searchsorted(self._terms, query, "right")
+        hits = [np.arange(l, h) for l, h in zip(lo, hi) if h > l]
+        if not hits:
+            return np.zeros(len(self._spans))
+        postings = np.concatenate(hits)
+        return np.bincount(self._chunk_of[postings], self._weights[postings], minlength=len(self._spans))
+
+    def top_k(self, question, k=TOP_K):
+        """Indices of the ``k`` best-scoring chunks with any match, best first."""
+        scores = self.scores(question)
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [int(i) for i in best if scores[i] > 0]
+
+    def context(self, question, k=TOP_K):
+        """The resume text to send with ``question``."""
+        if len(self) <= k:
+            return self.text
+        # Nothing matched (e.g. "what do you think?"): the start of the resume is the summary
+        selected = self.top_k(question, k) or range(k)
+        context = "\n\n".join(self.chunk(i) for i in sorted(selected))
+        instrumentation.registry.inc("resume_index_chars_saved_total", {}, len(self.text) - len(context))
+        logging.info(f"Resume follow-up sends {len(context)} of {len(self.text)} characters ({len(selected)} chunks)")
+        return context
+
+    @property
+    def nbytes(self):
+        # The text itself belongs to the session
+        return self._terms.nbytes + self._chunk_of.nbytes + self._weights.nbytes + sys.getsizeof(self._spans)
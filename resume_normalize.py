@@ -0,0 +1,235 @@
+"""Clean-up of extracted resume text before it is sent to Flowise.
+
+``page.extract_text()`` output carries a lot of characters the LLM pays for
+but learns nothing from: the same header and footer on every page, page
+numbers, words hyphenated across line breaks and runs of whitespace used for
+layout. ``normalize_pages`` streams page texts (e.g. from
+pdf_extract.iter_page_texts) through these stages:
+
+1. page furniture: a line in the top EDGE_LINES of a page that is also in
+   the top EDGE_LINES of a neighbouring page is dropped, and likewise at the
+   bottom. Digits inside page labels are ignored when comparing, so "Page 2
+   of 3" matches "Page 3 of 3"; other digits are not ("University of X 2019"
+   does not match "... 2020"). Page labels ("Page 2", "2 of 3", "- 2 -") and
+   bare numbers equal to the page's own number are dropped at either edge.
+   Single-page documents are left as they are. Only one page is held back
+   at a time to compare with the next,
+2. dehyphenation: "experi-\\nence" becomes "experience" when the next line
+   starts in lower case,
+3. whitespace: runs of spaces and tabs become one space, lines are stripped
+   and blank lines collapse to one.
+
+It returns the text and a NormalizationStats saying how many characters each
+stage removed. ``segment_sections`` optionally splits the result into the
+usual resume sections (Experience, Education, Skills, ...).
+"""
+import logging
+import os
+import re
+
+import instrumentation
+
+SEGMENT_SECTIONS = os.environ.get("RESUME_SEGMENT_SECTIONS", "0") == "1"
+# Lines at the top and bottom of a page considered for header/footer removal
+EDGE_LINES = 3
+
+_DIGITS_RE = re.compile(r"\d+")
+_SPACE_RE = re.compile(r"[ \t\xa0\f\v]+")
+# "Page 2", "Page 2 of 3", "2 of 3", "2/3", "- 2 -", anywhere in a line
+_PAGE_LABEL_RE = re.compile(
+    r"\bpage\s*\d+(?:\s*(?:of|/)\s*\d+)?\b|\b\d{1,3}\s*(?:of|/)\s*\d{1,3}\b|[-–]\s*\d{1,3}\s*[-–]",
+    re.IGNORECASE,
+)
+_BARE_NUMBER_RE = re.compile(r"^\(?\s*(\d{1,3})\s*\)?$")
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(?=[a-z])")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_NONBLANK_RE = re.compile(r"\S")
+
+SECTION_HEADINGS = {
+    "summary": "Summary",
+    "profile": "Summary",
+    "professional summary": "Summary",
+    "objective": "Summary",
+    "experience": "Experience",
+    "work experience": "Experience",
+    "professional experience": "Experience",
+    "employment": "Experience",
+    "employment history": "Experience",
+    "work history": "Experience",
+    "education": "Education",
+    "academic background": "Education",
+    "qualifications": "Education",
+    "skills": "Skills",
+    "technical skills": "Skills",
+    "core skills": "Skills",
+    "key skills": "Skills",
+    "projects": "Projects",
+    "certifications": "Certifications",
+    "certificates": "Certifications",
+    "awards": "Awards",
+    "honors": "Awards",
+    "achievements": "Awards",
+    "publications": "Publications",
+    "languages": "Languages",
+    "volunteer": "Volunteering",
+    "volunteering": "Volunteering",
+    "volunteer experience": "Volunteering",
+    "interests": "Interests",
+    "references": "References",
+}
+
+
+class NormalizationStats:
+    __slots__ = ("chars_in", "chars_out", "furniture", "hyphenation", "whitespace")
+
+    def __init__(self):
+        self.chars_in = self.chars_out = 0
+        self.furniture = self.hyphenation = self.whitespace = 0
+
+    @property
+    def removed(self):
+        return self.chars_in - self.chars_out
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _furniture_key(line):
+    line = " ".join(line.split()).lower()
+    return _PAGE_LABEL_RE.sub(lambda m: _DIGITS_RE.sub("#", m.group()), line)
+
+
+def _edges(lines):
+    """(top, bottom): indexes of the first and last EDGE_LINES non-blank lines."""
+    nonblank = [i for i, line in enumerate(lines) if line.strip()]
+    return nonblank[:EDGE_LINES], nonblank[-EDGE_LINES:]
+
+
+def _edge_keys(lines):
+    top, bottom = _edges(lines)
+    return {_furniture_key(lines[i]) for i in top}, {_furniture_key(lines[i]) for i in bottom}
+
+
+def _is_page_number(line, page_number):
+    if _PAGE_LABEL_RE.fullmatch(line):
+        return True
+    bare = _BARE_NUMBER_RE.match(line)
+    return bare is not None and int(bare.group(1)) == page_number
+
+
+def _strip_furniture(lines, page_number, neighbours):
+    """``lines`` without furniture, given the edge keys of the neighbouring pages."""
+    top_keys = set().union(*(top for top, _ in neighbours))
+    bottom_keys = set().union(*(bottom for _, bottom in neighbours))
+    top, bottom = _edges(lines)
+    dropped = set()
+    for indexes, keys in ((top, top_keys), (bottom, bottom_keys)):
+        for i in indexes:
+            stripped = lines[i].strip()
+            if _furniture_key(stripped) in keys or _is_page_number(stripped, page_number):
+                dropped.add(i)
+    return [line for i, line in enumerate(lines) if i not in dropped]
+
+
+def _clean_page(text, stats):
+    before = len(text)
+    text = "\n".join(_SPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    stats.whitespace += before - len(text)
+
+    before = len(text)
+    text = _HYPHEN_BREAK_RE.sub(r"\1", text)
+    stats.hyphenation += before - len(text)
+
+    before = len(text)
+    text = _BLANK_LINES_RE.sub("\n\n", text).strip("\n")
+    stats.whitespace += before - len(text)
+    return text
+
+
+def iter_normalized_pages(pages, stats=None):
+    """Yield each page of ``pages`` cleaned, one page behind the input."""
+    stats = stats if stats is not None else NormalizationStats()
+    previous_keys = None
+    held = None
+    page_number = 0
+    for text in pages:
+        stats.chars_in += len(text)
+        lines = text.split("\n")
+        if held is not None:
+            held_keys = _edge_keys(held)
+            neighbours = [keys for keys in (previous_keys, _edge_keys(lines)) if keys is not None]
+            yield _finish_page(held, page_number, neighbours, stats)
+            previous_keys = held_keys
+        held = lines
+        page_number += 1
+    if held is not None:
+        # With no neighbour (a single page) nothing is taken for furniture
+        neighbours = [previous_keys] if previous_keys is not None else []
+        yield _finish_page(held, page_number, neighbours, stats)
+
+
+def _finish_page(lines, page_number, neighbours, stats):
+    before = sum(len(line) + 1 for line in lines)
+    if neighbours:
+        lines = _strip_furniture(lines, page_number, neighbours)
+    text = "\n".join(lines)
+    stats.furniture += before - (len(text) + 1)
+    text = _clean_page(text, stats)
+    stats.chars_out += len(text)
+    return text
+
+
+def normalize_pages(pages):
+    """Return (text, NormalizationStats) for an iterable of page texts."""
+    stats = NormalizationStats()
+    parts = [page for page in iter_normalized_pages(pages, stats) if page]
+    text = "\n\n".join(parts)
+    # Page joins add separators the per-page counts did not include
+    stats.chars_out = len(text)
+    for stage in ("furniture", "hyphenation", "whitespace"):
+        instrumentation.registry.inc("resume_normalize_chars_removed_total", {"stage": stage}, getattr(stats, stage))
+    logging.info(
+        f"Resume text normalized from {stats.chars_in} to {stats.chars_out} characters "
+        f"(furniture {stats.furniture}, hyphenation {stats.hyphenation}, whitespace {stats.whitespace})"
+    )
+    return text, stats
+
+
+def _heading(line):
+    candidate = line.strip().rstrip(":").strip().lower()
+    if len(candidate) > 40:
+        return None
+    return SECTION_HEADINGS.get(" ".join(candidate.split()))
+
+
+def iter_section_spans(text):
+    """Yield (section, start, end) for each section of ``text``, text[start:end]
+    being its body; text before the first heading is "Header"."""
+    name, start, pos = "Header", 0, 0
+    for line in text.split("\n"):
+        line_end = pos + len(line)
+        heading = _heading(line)
+        if heading is not None:
+            if _NONBLANK_RE.search(text, start, pos):
+                yield name, start, pos
+            name, start = heading, min(line_end + 1, len(text))
+        pos = line_end + 1
+    if _NONBLANK_RE.search(text, start):
+        yield name, start, len(text)
+
+
+def segment_sections(text):
+    """Split resume text into [(section, body)]."""
+    return [(name, text[start:end].strip()) for name, start, end in iter_section_spans(text)]
+
+
+def format_sections(sections):
+    return "\n\n".join(f"{name.upper()}:\n{body}" for name, body in sections)
+
+
+def normalize_resume(pages, segment=SEGMENT_SECTIONS):
+    """The resume text to send to Flowise for an iterable of page texts."""
+    text, _ = normalize_pages(pages)
+    if segment:
+        text = format_sections(segment_sections(text))
+    return text
@@ -0,0 +1,283 @@
+"""Server-side persistence of session state, for multi-replica deployments.
+
+Everything a student builds up (the ConversationStore and the extracted
+resume text) used to live only in the Streamlit process that served them,
+so replicas needed sticky sessions and a restart lost every conversation.
+Sessions are now identified by a stable id carried in the URL (``?sid=``)
+and saved to a backend shared by all replicas; a reconnect to any node
+rehydrates the session from there.
+
+The sid is a bearer secret: whoever has the URL has the student's resume
+and history. main.py only adopts a sid from the URL when the store already
+holds that session, and moves a session to a new sid the first time it
+adds anything, so a link with a chosen sid can't capture a student's data.
+
+Saves are write-behind: ``SessionPersister.schedule`` only records that a
+session changed, and a background thread writes every changed session in
+one batch each SESSION_FLUSH_INTERVAL seconds (or sooner once
+SESSION_FLUSH_BATCH sessions are waiting). A session written twice between
+flushes is serialized once. A reconnect within the flush interval of the
+last answer can therefore miss that answer.
+
+Backends (SESSION_STORE_BACKEND):
+
+* ``none``: no persistence, the previous behaviour (the default),
+* ``sqlite``: one SQLite file (SESSION_STORE_PATH), e.g. on a volume shared
+  by the replicas,
+* ``file``: one JSON file per session under a directory (SESSION_STORE_PATH).
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+
+import instrumentation
+from conversation_store import ConversationStore
+from response_cache import thread_connection
+
+BACKEND = os.environ.get("SESSION_STORE_BACKEND", "none")
+FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", "1.0"))
+FLUSH_BATCH = int(os.environ.get("SESSION_FLUSH_BATCH", "64"))
+# Sessions untouched for this long are deleted
+SESSION_TTL = float(os.environ.get("SESSION_TTL", str(7 * 86400)))
+
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def valid_session_id(session_id):
+    return bool(session_id) and _SESSION_ID_RE.match(session_id) is not None
+
+
+class SQLiteBackend:
+    # Expired sessions are purged every this many flushes
+    PURGE_EVERY = 100
+
+    def __init__(self, path, ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._flushes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return thread_connection(self._local, self.path)
+
+    def load(self, session_id):
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        return row[0] if row else None
+
+    def save_many(self, items):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                [(session_id, data, now) for session_id, data in items],
+            )
+            self._flushes += 1
+            if self._flushes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM sessions WHERE updated_at <= ?", (now - self.ttl,))
+
+    def delete(self, session_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+class FileBackend:
+    # Expired sessions are purged every this many flushes
+    PURGE_EVERY = SQLiteBackend.PURGE_EVERY
+
+    def __init__(self, directory, ttl=SESSION_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._flushes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def load(self, session_id):
+        path = self._path(session_id)
+        try:
+            if os.path.getmtime(path) <= time.time() - self.ttl:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save_many(self, items):
+        for session_id, data in items:
+            path = self._path(session_id)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            # Atomic, so a replica loading concurrently never sees half a file
+            os.replace(tmp, path)
+        self._flushes += 1
+        if self._flushes % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def purge(self):
+        """Delete session files (they hold resumes) untouched for longer than the TTL."""
+        cutoff = time.time() - self.ttl
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith((".json", ".tmp")):
+                    continue
+                try:
+                    if entry.stat().st_mtime <= cutoff:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+
+def encode_session(store, resume_text):
+    return json.dumps({"resume_text": resume_text, "history": store.snapshot()}, ensure_ascii=False)
+
+
+def decode_session(session_id, data):
+    """(ConversationStore, resume_text) from ``encode_session`` output."""
+    state = json.loads(data)
+    history = state.get("history", {})
+    resume_text = state.get("resume_text")
+    # Share the resume text with the history message that carries it
+    for attachment in history.get("attachments", []):
+        if attachment == resume_text:
+            resume_text = attachment
+            break
+    return ConversationStore.restore(session_id, history), resume_text
+
+
+class SessionPersister:
+    def __init__(self, backend, flush_interval=FLUSH_INTERVAL, flush_batch=FLUSH_BATCH):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._pending = {}
+        # store -> (version, resume_text) last queued; dropped with the session
+        self._saved_versions = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        # Held while a batch is written, so forget() can't run between a flush
+        # taking a session and writing it, and have the session written back
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.saved = 0
+        self.errors = 0
+
+    def load(self, session_id):
+        """(ConversationStore, resume_text) for ``session_id``, or None if unknown."""
+        start = time.perf_counter()
+        try:
+            data = self.backend.load(session_id)
+            if data is None:
+                return None
+            store, resume_text = decode_session(session_id, data)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logging.warning(f"Could not load session {session_id}: {e}")
+            return None
+        finally:
+            instrumentation.registry.observe("session_load_seconds", {}, time.perf_counter() - start)
+        with self._lock:
+            self._saved_versions[store] = (store.version, resume_text)
+        return store, resume_text
+
+    def schedule(self, session_id, store, resume_text):
+        """Queue the session for the next flush if it changed since it was last saved."""
+        with self._lock:
+            state = (store.version, resume_text)
+            if self._saved_versions.get(store) == state:
+                return
+            self._pending[session_id] = (store, resume_text)
+            self._saved_versions[store] = state
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.flush_batch:
+                self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        start = time.perf_counter()
+        try:
+            # Serialized here, off the script thread; the store takes its own lock
+            items = [
+                (session_id, encode_session(store, resume_text))
+                for session_id, (store, resume_text) in pending.items()
+            ]
+            self.backend.save_many(items)
+        except (OSError, sqlite3.Error) as e:
+            self.errors += 1
+            logging.warning(f"Could not save {len(pending)} sessions: {e}")
+            with self._lock:
+                # Retry on the next flush unless the session changed again meanwhile
+                for session_id, entry in pending.items():
+                    self._pending.setdefault(session_id, entry)
+            return
+        finally:
+            instrumentation.registry.observe("session_flush_seconds", {}, time.perf_counter() - start)
+        self.flushes += 1
+        self.saved += len(items)
+
+    def forget(self, session_id):
+        with self._write_lock:
+            with self._lock:
+                self._pending.pop(session_id, None)
+            self.backend.delete(session_id)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "flushes": self.flushes, "saved": self.saved, "errors": self.errors}
+
+
+def _from_env():
+    if BACKEND == "sqlite":
+        backend = SQLiteBackend(os.environ.get("SESSION_STORE_PATH", "sessions.sqlite3"))
+    elif BACKEND == "file":
+        backend = FileBackend(os.environ.get("SESSION_STORE_PATH", "sessions"))
+    else:
+        return None
+    return SessionPersister(backend)
+
+
+session_persister = _from_env()
+
+if session_persister is not None:
+    atexit.register(session_persister.flush)
+    instrumentation.registry.register_collector(
+        "session_persister",
+        lambda: [(f"session_persister_{name}", {}, value) for name, value in session_persister.stats().items()],
+    )